@@ -0,0 +1,96 @@
+"""Micro-benchmark for AttendanceRecord.from_line.
+
+Compares the original parser (strptime for every line, state matched by
+iterating the enum) with the current fast path and the batch parser.
+
+Run from inside src/:
+    python -m benchmarks.bench_parse --lines 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from models.attendance import AttendanceRecord, AttendanceState, TIME_FMT
+
+
+def legacy_from_line(line: str) -> AttendanceRecord:
+    """The parser AttendanceRecord.from_line used before the fast path."""
+    parts = line.strip().split(",")
+    while len(parts) < 6:
+        parts.append("")
+
+    record_id = parts[0].strip()
+    student_id = parts[1].strip()
+    session_id = parts[2].strip()
+    time_str = parts[3].strip()
+    state_str = parts[4].strip()
+    note = parts[5].strip()
+
+    check_in_time = None
+    if time_str:
+        try:
+            check_in_time = datetime.strptime(time_str, TIME_FMT)
+        except ValueError:
+            try:
+                check_in_time = datetime.fromisoformat(time_str)
+            except Exception:
+                pass
+
+    state = AttendanceState.ABSENT
+    for s in AttendanceState:
+        if s.value.lower() == state_str.lower():
+            state = s
+            break
+
+    return AttendanceRecord(record_id, student_id, session_id, check_in_time, state, note)
+
+
+def make_lines(count: int, seed: int = 42) -> list:
+    """Build attendance.txt-style lines spread over two school years."""
+    rng = random.Random(seed)
+    start = datetime(2024, 9, 1, 7, 0)
+    states = [s.value for s in AttendanceState]
+    lines = []
+    for i in range(1, count + 1):
+        ts = start + timedelta(minutes=rng.randrange(0, 2 * 365 * 24 * 60))
+        lines.append(
+            f"A{i:06d},U{rng.randrange(50000):05d},S{rng.randrange(60000):05d},"
+            f"{ts.strftime(TIME_FMT)},{rng.choice(states)},"
+        )
+    return lines
+
+
+def _measure(label: str, func, lines: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(lines)
+        best = min(best, time.perf_counter() - t0)
+    rate = len(lines) / best
+    print(f"{label:<28} {best:8.3f} s   {rate:12,.0f} lines/s")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000, help="number of lines to parse")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per parser (best is kept)")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+
+    # Both parsers must agree before their speed means anything
+    for line in lines[:1000]:
+        assert legacy_from_line(line).to_line() == AttendanceRecord.from_line(line).to_line(), line
+
+    print(f"Parsing {len(lines):,} lines (best of {args.repeat})")
+    before = _measure("legacy from_line", lambda ls: [legacy_from_line(l) for l in ls], lines, args.repeat)
+    after = _measure("from_line (fast path)", lambda ls: [AttendanceRecord.from_line(l) for l in ls],
+                     lines, args.repeat)
+    batch = _measure("from_lines (batch)", AttendanceRecord.from_lines, lines, args.repeat)
+    print(f"Speed-up: {after / before:.1f}x per line, {batch / before:.1f}x batch")
+
+
+if __name__ == "__main__":
+    main()
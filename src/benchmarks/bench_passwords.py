@@ -0,0 +1,82 @@
+"""Benchmark of the password hash cost, for sizing it to the login peak.
+
+Times one verify_password call for a range of scrypt N values (PBKDF2
+iteration counts where hashlib has no scrypt), and from that the logins
+one CPU core can verify per second. With --peak-logins and --peak-minutes it
+also reports how many cores the morning login peak needs at each cost.
+The credential lookup itself is a dict access and is timed separately.
+
+Run from inside src/:
+    python -m benchmarks.bench_passwords --peak-logins 20000 --peak-minutes 10
+"""
+import argparse
+import json
+import math
+import time
+
+from services import passwords
+
+
+def _time_verify(cost: int, repeat: int) -> float:
+    """Median seconds of one successful verify_password at this cost."""
+    stored = passwords.hash_password("correct horse", cost)
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        assert passwords.verify_password("correct horse", stored)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def _time_lookup(users: int, repeat: int = 100_000) -> float:
+    """Seconds per credential lookup in an email index of ``users`` entries."""
+    index = {f"user{i:06d}@example.com": i for i in range(users)}
+    emails = [f"user{i * 7919 % users:06d}@example.com" for i in range(repeat)]
+    t0 = time.perf_counter()
+    for email in emails:
+        index.get(email)
+    return (time.perf_counter() - t0) / repeat
+
+
+def main() -> None:
+    default_costs = ([2 ** k for k in range(12, 18)] if passwords.HAS_SCRYPT
+                     else [50_000, 100_000, 200_000, 400_000, 600_000])
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--costs", type=int, nargs="+", default=default_costs,
+                        help="scrypt N values (or PBKDF2 iterations) to time")
+    parser.add_argument("--repeat", type=int, default=5, help="verifications per cost")
+    parser.add_argument("--peak-logins", type=int, default=20_000, help="logins in the peak window")
+    parser.add_argument("--peak-minutes", type=float, default=10.0, help="length of the peak window")
+    parser.add_argument("--users", type=int, default=50_000, help="users in the lookup benchmark")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    peak_rate = args.peak_logins / (args.peak_minutes * 60)
+    algorithm = "scrypt" if passwords.HAS_SCRYPT else "pbkdf2_sha256"
+    lookup = _time_lookup(args.users)
+    print(f"{algorithm}; lookup in {args.users:,} users: {lookup * 1e6:.3f} us; "
+          f"peak {args.peak_logins:,} logins in {args.peak_minutes:g} min = {peak_rate:.1f} /s")
+    print(f"{'cost':>10} | {'verify ms':>10} | {'logins/s/core':>14} | {'cores for peak':>14}")
+    print("-" * 58)
+
+    rows = []
+    for cost in args.costs:
+        seconds = _time_verify(cost, args.repeat)
+        per_core = 1 / seconds
+        cores = math.ceil(peak_rate / per_core)
+        rows.append({"cost": cost, "verify_ms": round(seconds * 1000, 3),
+                     "logins_per_s_per_core": round(per_core, 1), "cores_for_peak": cores})
+        marker = "  <- current" if cost == (passwords.SCRYPT_N if passwords.HAS_SCRYPT
+                                            else passwords.PBKDF2_ITERATIONS) else ""
+        print(f"{cost:>10} | {seconds * 1000:>10.2f} | {per_core:>14.1f} | {cores:>14}{marker}")
+
+    if args.output:
+        result = {"algorithm": algorithm, "lookup_us": round(lookup * 1e6, 3),
+                  "peak_logins_per_s": round(peak_rate, 1), "costs": rows}
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(json.dumps(result, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
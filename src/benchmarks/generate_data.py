@@ -0,0 +1,190 @@
+"""Synthetic dataset generator for benchmarks and load tests.
+
+Writes users.txt, courses.txt, classes.txt, sessions.txt, class_student.txt,
+attendance.txt and corrections.txt in the same formats as data/, at any scale.
+
+Run from inside src/:
+    python -m benchmarks.generate_data /tmp/sas_data --students 50000 \\
+        --classes 2000 --attendance 5000000
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+from models.attendance import TIME_FMT
+
+STATES = ("Present", "Present", "Present", "Present", "Present", "Present", "Late", "Late", "Absent")
+ROOMS = [f"{b}{f}-{r:02d}" for b in "ABCDE" for f in range(1, 6) for r in range(1, 11)]
+
+
+def _write(path: str, lines) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        for line in lines:
+            fh.write(line + "\n")
+            count += 1
+    return count
+
+
+def generate(
+    data_dir: str,
+    students: int = 1000,
+    lecturers: int = 50,
+    courses: int = 40,
+    classes: int = 60,
+    classes_per_student: int = 4,
+    sessions_per_class: int = 30,
+    attendance: int = 50000,
+    corrections: int = 500,
+    start_date: datetime = datetime(2024, 9, 2),
+    open_sessions: int = 20,
+    seed: int = 42,
+) -> dict:
+    """Write a synthetic dataset into ``data_dir`` and return the row counts.
+
+    Sessions are weekly, one slot per class. The ``open_sessions`` sessions
+    closest to now are marked Open (everything else Locked) so check-in
+    benchmarks have something to check into. Attendance rows are emitted
+    session by session, for about 90% of each class roster, until the
+    requested number of rows is reached.
+    """
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    # Id counters left by a previous dataset do not match this one; the
+    # services seed missing counters from the new files
+    for entry in os.listdir(data_dir):
+        if entry.endswith(".seq"):
+            os.remove(os.path.join(data_dir, entry))
+    counts = {}
+
+    # users: admin, lecturers, students
+    lecturer_ids = [f"U{1 + i:06d}" for i in range(lecturers)]
+    student_ids = [f"U{1 + lecturers + i:06d}" for i in range(students)]
+
+    def users():
+        yield "U000000,Admin,admin@system.com,admin,admin"
+        for i, uid in enumerate(lecturer_ids):
+            yield f"{uid},Lecturer {i},lecturer{i}@uni.edu,pw{i},lecturer"
+        for i, uid in enumerate(student_ids):
+            yield f"{uid},Student {i},student{i}@uni.edu,pw{i},student"
+
+    counts["users"] = _write(os.path.join(data_dir, "users.txt"), users())
+
+    course_ids = [f"C{1 + i:04d}" for i in range(courses)]
+    counts["courses"] = _write(
+        os.path.join(data_dir, "courses.txt"),
+        (f"{cid},Course {i},{rng.choice((2, 3, 4))}" for i, cid in enumerate(course_ids)),
+    )
+
+    class_ids = [f"CL{1 + i:05d}" for i in range(classes)]
+    class_lecturer = {cid: rng.choice(lecturer_ids) for cid in class_ids}
+    counts["classes"] = _write(
+        os.path.join(data_dir, "classes.txt"),
+        (f"{cid},N{i % 20 + 1},2024A,{rng.choice(course_ids)},{class_lecturer[cid]}"
+         for i, cid in enumerate(class_ids)),
+    )
+
+    # enrollments
+    roster = {cid: [] for cid in class_ids}
+    per_student = min(classes_per_student, classes)
+    for sid in student_ids:
+        for cid in rng.sample(class_ids, per_student):
+            roster[cid].append(sid)
+    counts["class_student"] = _write(
+        os.path.join(data_dir, "class_student.txt"),
+        (f"{cid},{sid}" for cid in class_ids for sid in roster[cid]),
+    )
+
+    # sessions: weekly, each class gets a fixed weekday/slot
+    slots = ["07:00", "09:30", "13:00", "15:30", "18:00"]
+    now = datetime.now()
+    sessions = []
+    n = 0
+    for cid in class_ids:
+        weekday = rng.randrange(6)
+        slot = rng.choice(slots)
+        room = rng.choice(ROOMS)
+        for week in range(sessions_per_class):
+            n += 1
+            day = start_date + timedelta(days=weekday + 7 * week)
+            start = datetime.strptime(f"{day:%Y-%m-%d} {slot}", TIME_FMT)
+            sessions.append([f"S{n:07d}", cid, start, f"Week{week + 1}", room])
+    sessions.sort(key=lambda s: s[2])
+    open_ids = {s[0] for s in sorted(sessions, key=lambda s: abs(s[2] - now))[:open_sessions]}
+    counts["sessions"] = _write(
+        os.path.join(data_dir, "sessions.txt"),
+        (f"{sid},{cid},{start:%Y-%m-%d},{start:%H:%M},{week},{room},"
+         f"{'Open' if sid in open_ids else 'Locked'}"
+         for sid, cid, start, week, room in sessions),
+    )
+
+    # attendance, session by session in date order
+    records = []
+
+    def attendance_lines():
+        rid = 0
+        for sid, cid, start, _week, _room in sessions:
+            for student in roster[cid]:
+                if rid >= attendance:
+                    return
+                if rng.random() >= 0.9:
+                    continue
+                rid += 1
+                state = rng.choice(STATES)
+                if state == "Absent":
+                    time_str = ""
+                elif state == "Late":
+                    time_str = (start + timedelta(minutes=rng.randrange(16, 60))).strftime(TIME_FMT)
+                else:
+                    time_str = (start + timedelta(minutes=rng.randrange(-10, 16))).strftime(TIME_FMT)
+                if len(records) < corrections and state != "Present" and rng.random() < 0.05:
+                    records.append((f"A{rid:07d}", student, sid, class_lecturer[cid], start))
+                yield f"A{rid:07d},{student},{sid},{time_str},{state},"
+
+    counts["attendance"] = _write(os.path.join(data_dir, "attendance.txt"), attendance_lines())
+
+    def correction_lines():
+        for i, (rid, student, sid, lecturer, start) in enumerate(records):
+            status = "Pending" if i % 3 else rng.choice(("Approved", "Rejected"))
+            stamp = (start + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+            yield f"CR{i + 1:04d}|{student}|{sid}|{rid}|Synthetic request {i + 1}|{status}||{stamp}|{lecturer}"
+
+    counts["corrections"] = _write(os.path.join(data_dir, "corrections.txt"), correction_lines())
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_dir", help="directory to write the data files into")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--lecturers", type=int, default=50)
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--classes", type=int, default=60)
+    parser.add_argument("--classes-per-student", type=int, default=4)
+    parser.add_argument("--sessions-per-class", type=int, default=30)
+    parser.add_argument("--attendance", type=int, default=50000, help="maximum attendance rows")
+    parser.add_argument("--corrections", type=int, default=500, help="maximum correction requests")
+    parser.add_argument("--open-sessions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate(
+        args.data_dir,
+        students=args.students,
+        lecturers=args.lecturers,
+        courses=args.courses,
+        classes=args.classes,
+        classes_per_student=args.classes_per_student,
+        sessions_per_class=args.sessions_per_class,
+        attendance=args.attendance,
+        corrections=args.corrections,
+        open_sessions=args.open_sessions,
+        seed=args.seed,
+    )
+    for name, count in counts.items():
+        print(f"{name + '.txt':<20} {count:>12,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Multi-process check-in load test.
+
+Spawns N worker processes that all start at the same moment (a lecture-start
+burst) and check students into the open sessions of one shared data
+directory, either by calling attendance_service.student_checkin directly or
+through the check-in service (--server). A fraction of the (student, session)
+pairs is submitted by two workers, so duplicate check-in handling is
+exercised too.
+
+Reports throughput, p50/p95/p99 latency, and what ended up in
+attendance.txt: duplicate record ids, lost check-ins (acknowledged but not
+written) and duplicate check-ins (a pair written more than once).
+
+Run from inside src/:
+    python -m benchmarks.generate_data /tmp/sas_data --open-sessions 40
+    python -m benchmarks.load_checkin /tmp/sas_data --copy --workers 8
+    python -m benchmarks.load_checkin /tmp/sas_data --server 127.0.0.1:8765
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _worker(data_dir: str, server: Optional[str], jobs: List[tuple], ready, start, results) -> None:
+    """Check in every (student_id, session_id) of ``jobs`` and report the outcomes."""
+    os.environ["SAS_DATA_DIR"] = data_dir
+    from services import repository
+    from services.attendance_service import student_checkin
+
+    repository.set_data_dir(data_dir)
+    if server:
+        from services.checkin_server import CheckinClient
+        host, port = server.rsplit(":", 1)
+        client = CheckinClient(host, int(port))
+
+        def checkin(student_id, session_id):
+            response = client.checkin(student_id, session_id)
+            return response["ok"], response["message"]
+    else:
+        checkin = student_checkin
+
+    outcomes = []
+    ready.release()
+    start.wait()
+    for student_id, session_id in jobs:
+        t0 = time.perf_counter()
+        try:
+            ok, message = checkin(student_id, session_id)
+        except Exception as e:
+            ok, message = False, f"error: {e}"
+        outcomes.append((student_id, session_id, ok, message, time.perf_counter() - t0))
+    results.put(outcomes)
+
+
+def _read_records(data_dir: str) -> List[List[str]]:
+    from services import repository
+    repository.set_data_dir(data_dir)
+    return [line.split(",", 5) for line in repository.iter_lines("attendance.txt")]
+
+
+def run(data_dir: str, workers: int = 8, max_checkins: int = 0, repeat_fraction: float = 0.1,
+        server: Optional[str] = None, seed: int = 42) -> dict:
+    """Run the load test against ``data_dir`` and return the results dict."""
+    from services import repository
+    from services.attendance_service import has_checked_in
+    from services.timetable_service import get_class_students, load_sessions
+
+    repository.set_data_dir(data_dir)
+    rng = random.Random(seed)
+
+    # Every roster pair of every open session that is not checked in yet
+    pairs = [
+        (student_id, sess["id"])
+        for sess in load_sessions() if sess["status"].lower() == "open"
+        for student_id in get_class_students(sess["class_id"])
+        if not has_checked_in(student_id, sess["id"])
+    ]
+    if not pairs:
+        raise SystemExit(f"No open sessions with students left to check in under {data_dir}")
+    rng.shuffle(pairs)
+    if max_checkins:
+        pairs = pairs[:max_checkins]
+
+    # Deal the pairs out round-robin; some pairs also go to a second worker
+    jobs = [[] for _ in range(workers)]
+    for i, pair in enumerate(pairs):
+        jobs[i % workers].append(pair)
+        if workers > 1 and rng.random() < repeat_fraction:
+            jobs[(i + 1 + rng.randrange(workers - 1)) % workers].append(pair)
+    for worker_jobs in jobs:
+        rng.shuffle(worker_jobs)
+
+    before = _read_records(data_dir)
+    known_ids = Counter(parts[0] for parts in before)
+
+    ctx = mp.get_context("spawn")
+    ready = ctx.Semaphore(0)
+    start = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(data_dir, server, worker_jobs, ready, start, results))
+             for worker_jobs in jobs]
+    for proc in procs:
+        proc.start()
+    # Start the burst once every worker has imported and connected
+    for _ in procs:
+        ready.acquire()
+
+    t0 = time.perf_counter()
+    start.set()
+    outcomes = [o for _ in procs for o in results.get()]
+    elapsed = time.perf_counter() - t0
+    for proc in procs:
+        proc.join()
+
+    # What actually ended up in attendance.txt
+    new_records = _read_records(data_dir)[len(before):]
+    id_counts = Counter(parts[0] for parts in new_records)
+    duplicate_ids = sum(1 for rid, n in id_counts.items() if n > 1 or rid in known_ids)
+    pair_counts = Counter((parts[1], parts[2]) for parts in new_records if len(parts) > 2)
+    acknowledged = {(sid, sess) for sid, sess, ok, _msg, _lat in outcomes if ok}
+    ok_counts = Counter((sid, sess) for sid, sess, ok, _msg, _lat in outcomes if ok)
+
+    latencies = sorted(lat for *_rest, lat in outcomes)
+    errors = Counter(msg for _sid, _sess, ok, msg, _lat in outcomes if not ok)
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "mode": f"server {server}" if server else "direct student_checkin",
+        "storage": repository.get_storage().name,
+        "workers": workers,
+        "requests": len(outcomes),
+        "unique_pairs": len(pairs),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(outcomes) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "accepted": sum(ok_counts.values()),
+        "rejected": dict(errors),
+        "records_written": len(new_records),
+        "duplicate_record_ids": duplicate_ids,
+        "lost_checkins": len(acknowledged - set(pair_counts)),
+        "duplicate_checkins": sum(1 for n in pair_counts.values() if n > 1),
+        "double_acknowledged": sum(1 for n in ok_counts.values() if n > 1),
+        "missing_pairs": len(set(pairs) - set(pair_counts)),
+    }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_dir", help="data directory with open sessions")
+    parser.add_argument("--workers", type=int, default=8, help="worker processes")
+    parser.add_argument("--max-checkins", type=int, default=0, help="limit the number of (student, session) pairs")
+    parser.add_argument("--repeat-fraction", type=float, default=0.1,
+                        help="share of pairs also submitted by a second worker")
+    parser.add_argument("--server", help="HOST:PORT of a running check-in service to drive instead")
+    parser.add_argument("--copy", action="store_true", help="run against a temporary copy of data_dir")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.server and args.copy:
+        parser.error("--copy cannot be used with --server (the service owns its data directory)")
+
+    with contextlib.ExitStack() as stack:
+        data_dir = os.path.abspath(args.data_dir)
+        if args.copy:
+            tmp = stack.enter_context(tempfile.TemporaryDirectory(prefix="sas_load_"))
+            data_dir = os.path.join(tmp, "data")
+            shutil.copytree(args.data_dir, data_dir)
+        result = run(data_dir, args.workers, args.max_checkins, args.repeat_fraction, args.server, args.seed)
+
+    print(f"{result['requests']:,} check-ins by {result['workers']} workers in {result['elapsed_s']} s "
+          f"({result['throughput_per_s']:,} /s)   p50 {result['p50_ms']} ms   p95 {result['p95_ms']} ms   "
+          f"p99 {result['p99_ms']} ms", file=sys.stderr)
+    print(f"duplicate ids {result['duplicate_record_ids']}   lost {result['lost_checkins']}   "
+          f"duplicate check-ins {result['duplicate_checkins']}   missing {result['missing_pairs']}", file=sys.stderr)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
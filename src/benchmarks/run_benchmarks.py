@@ -0,0 +1,185 @@
+"""Benchmark harness for the service hot paths.
+
+Times the student, lecturer, report, correction and admin operations against
+a data directory (usually one written by benchmarks.generate_data) and prints
+the results as JSON so runs can be compared to catch regressions.
+
+The benchmarks write to the data directory (check-ins, corrections, admin
+adds/deletes). Pass --copy to run against a temporary copy instead.
+
+Run from inside src/:
+    python -m benchmarks.generate_data /tmp/sas_data
+    python -m benchmarks.run_benchmarks /tmp/sas_data --copy --output results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from services import admin_service, repository
+from services.attendance_service import get_student_history, student_checkin
+from services.correction_service import CorrectionService
+from services.report_service import generate_report_by_class, generate_report_by_student
+from services.timetable_service import get_student_timetable, load_classes, load_enrollments, load_sessions
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def time_operation(name: str, func: Callable[[int], object], iterations: int) -> dict:
+    """Call ``func(i)`` for i in range(iterations) and summarise the latencies.
+
+    The first call is reported separately as ``first_ms`` since it usually
+    pays for loading the data files into the repository cache.
+    """
+    timings = []
+    sink = io.StringIO()
+    for i in range(iterations):
+        with contextlib.redirect_stdout(sink):
+            t0 = time.perf_counter()
+            func(i)
+            timings.append(time.perf_counter() - t0)
+        sink.seek(0)
+        sink.truncate()
+
+    steady = sorted(timings[1:]) or timings
+    total = sum(timings)
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "first_ms": round(timings[0] * 1000, 3),
+        "mean_ms": round(statistics.fmean(steady) * 1000, 3),
+        "p50_ms": round(_percentile(steady, 50) * 1000, 3),
+        "p95_ms": round(_percentile(steady, 95) * 1000, 3),
+        "max_ms": round(max(steady) * 1000, 3),
+        "ops_per_s": round(iterations / total, 1) if total else None,
+    }
+    print(f"{name:<40} first {result['first_ms']:>10.2f} ms   p50 {result['p50_ms']:>9.2f} ms   "
+          f"p95 {result['p95_ms']:>9.2f} ms", file=sys.stderr)
+    return result
+
+
+def _count_lines(filename: str) -> int:
+    return sum(1 for _ in repository.iter_lines(filename))
+
+
+def run(data_dir: str, iterations: int = 20, seed: int = 42, only: Optional[List[str]] = None) -> dict:
+    """Run every benchmark against ``data_dir`` and return the results dict."""
+    repository.set_data_dir(data_dir)
+
+    dataset = {
+        name: _count_lines(f"{name}.txt")
+        for name in ("users", "courses", "classes", "sessions", "class_student", "attendance", "corrections")
+    }
+
+    rng = random.Random(seed)
+    enrollments = load_enrollments()
+    student_ids = sorted({sid for _cid, sid in enrollments})
+    class_ids = [c["id"] for c in load_classes()]
+    open_sessions = [s["id"] for s in load_sessions() if s["status"].lower() == "open"]
+    if not student_ids or not class_ids:
+        raise SystemExit(f"No enrollments/classes found in {data_dir}")
+    repository.invalidate()
+
+    students = [rng.choice(student_ids) for _ in range(iterations)]
+    classes = [rng.choice(class_ids) for _ in range(iterations)]
+    stamp = datetime.now().strftime("%H%M%S")
+
+    benchmarks = []
+
+    def bench(name: str, func: Callable[[int], object]) -> None:
+        if only and not any(key in name for key in only):
+            return
+        benchmarks.append(time_operation(name, func, iterations))
+
+    # Student / lecturer paths
+    if open_sessions:
+        bench("attendance.student_checkin",
+              lambda i: student_checkin(f"BENCH{stamp}{i:05d}", open_sessions[i % len(open_sessions)]))
+    bench("attendance.get_student_history", lambda i: get_student_history(students[i]))
+    bench("timetable.get_student_timetable", lambda i: get_student_timetable(students[i]))
+
+    # Reports
+    bench("report.generate_report_by_class", lambda i: generate_report_by_class(classes[i]))
+    bench("report.generate_report_by_student", lambda i: generate_report_by_student(students[i]))
+
+    # Corrections (requests go to a lecturer id no real data uses)
+    bench("correction.request_correction",
+          lambda i: CorrectionService().request_correction(
+              students[i], f"SBENCH{i}", f"ABENCH{i}", "benchmark", f"UBENCH{stamp}"))
+    bench("correction.list_pending_requests",
+          lambda i: CorrectionService().list_pending_requests(f"UBENCH{stamp}"))
+    created = [r.request_id for r in CorrectionService().list_pending_requests(f"UBENCH{stamp}")]
+    if created:
+        bench("correction.approve_or_reject_request",
+              lambda i: CorrectionService().approve_request(created[i % len(created)], "benchmark") if i % 2 == 0
+              else CorrectionService().reject_request(created[i % len(created)], "benchmark"))
+
+    # Admin CRUD
+    bench("admin.list_users", lambda i: admin_service.list_users())
+    bench("admin.add_user",
+          lambda i: admin_service.add_user(f"Bench {i}", f"bench{stamp}{i}@uni.edu", "pw", "student"))
+    bench("admin.delete_user",
+          lambda i: admin_service.delete_user(next(u.id for u in admin_service.list_users()
+                                                   if u.email == f"bench{stamp}{i}@uni.edu")))
+    bench("admin.add_course", lambda i: admin_service.add_course(f"Bench course {stamp} {i}", "3"))
+    bench("admin.delete_course",
+          lambda i: admin_service.delete_course(next(c["id"] for c in admin_service.list_courses()
+                                                     if c["name"] == f"Bench course {stamp} {i}")))
+    bench("admin.add_class", lambda i: admin_service.add_class(f"B{stamp}{i}", "BENCH", "C001", "UBENCH"))
+    bench("admin.delete_class",
+          lambda i: admin_service.delete_class(next(c["id"] for c in admin_service.list_classes()
+                                                    if c["name"] == f"B{stamp}{i}")))
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage": repository.get_storage().name,
+        "dataset": dataset,
+        "benchmarks": benchmarks,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_dir", help="data directory to benchmark against")
+    parser.add_argument("--iterations", type=int, default=20, help="calls per operation")
+    parser.add_argument("--copy", action="store_true", help="run against a temporary copy of data_dir")
+    parser.add_argument("--only", nargs="*", help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir
+        if args.copy:
+            tmp = stack.enter_context(tempfile.TemporaryDirectory(prefix="sas_bench_"))
+            data_dir = os.path.join(tmp, "data")
+            shutil.copytree(args.data_dir, data_dir)
+        results = run(data_dir, iterations=args.iterations, seed=args.seed, only=args.only)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from services.admin_service import (
     list_classes, add_class, delete_class,
     get_system_statistics
 )
+from services.report_service import export_all_reports
 
 
 def handle_manage_users():
@@ -259,6 +260,33 @@ def handle_view_system_reports():
     input("\nNhan Enter de quay lai...")
 
 
+def handle_export_all_reports():
+    """Export every class and student attendance report into a directory."""
+    print("\n" + "="*80)
+    print("--- XUAT TOAN BO BAO CAO DIEM DANH ---")
+    print("="*80)
+
+    output_dir = input("Thu muc luu bao cao (Enter = reports): ").strip() or "reports"
+
+    workers_str = input("So tien trinh xuat song song (Enter = tu dong): ").strip()
+    if workers_str and not workers_str.isdigit():
+        print("[ERROR] So tien trinh khong hop le.")
+        input("\nNhan Enter de quay lai...")
+        return
+    workers = int(workers_str) if workers_str else None
+
+    print("\nDang tao bao cao...")
+    result = export_all_reports(output_dir, workers)
+
+    print(f"[OK] Da xuat {result['written']} bao cao vao thu muc {output_dir}.")
+    if result["failed"]:
+        print(f"[ERROR] Khong the xuat {len(result['failed'])} bao cao:")
+        for filename in result["failed"]:
+            print(f"  - {filename}")
+
+    input("\nNhan Enter de quay lai...")
+
+
 def admin_menu(current_user):
     """Main menu for admin users."""
     while True:
@@ -269,6 +297,7 @@ def admin_menu(current_user):
         print("(2) Quan ly mon hoc")
         print("(3) Quan ly lop hoc")
         print("(4) Xem bao cao he thong")
+        print("(5) Xuat toan bo bao cao diem danh")
         print("(0) Dang xuat")
         print("="*80)
 
@@ -282,6 +311,8 @@ def admin_menu(current_user):
             handle_manage_classes()
         elif choice == '4':
             handle_view_system_reports()
+        elif choice == '5':
+            handle_export_all_reports()
         elif choice == '0':
             print("\n[OK] Dang xuat thanh cong.")
             break
@@ -1,6 +1,10 @@
-from services.timetable_service import load_sessions, load_classes, load_courses, get_students_in_session
+from services.timetable_service import (
+    load_courses, get_students_in_session, get_class_students,
+    get_lecturer_classes, get_lecturer_schedule, get_lecturer_next_sessions, day_range, week_range
+)
 from services.attendance_service import lecturer_take_attendance, get_student_history
 from services.correction_service import CorrectionService
+from services.user_directory import get_user_names
 
 
 def handle_view_teaching_schedule(current_user):
@@ -10,58 +14,29 @@ def handle_view_teaching_schedule(current_user):
 
     lecturer_id = current_user.user_id
 
-    # Load all classes taught by this lecturer
-    all_classes = load_classes()
-    lecturer_classes = [c for c in all_classes if c.get("lecturer_id") == lecturer_id]
-
-    if not lecturer_classes:
+    if not get_lecturer_classes(lecturer_id):
         print("Ban khong co lop hoc nao duoc phan cong.")
         input("\nNhan Enter de quay lai...")
         return
 
-    # Load all sessions for these classes
-    all_sessions = load_sessions()
-    courses = load_courses()
-
-    # Create course lookup map
-    course_map = {c["id"]: c["name"] for c in courses}
-    class_ids = [c["id"] for c in lecturer_classes]
+    print("(1) Tuan nay  (2) Hom nay  (3) 10 buoi sap toi  (4) Ca hoc ky")
+    choice = input("Chon pham vi (Enter = ca hoc ky): ").strip() or "4"
 
-    lecturer_sessions = [s for s in all_sessions if s.get("class_id") in class_ids]
+    # Schedule rows already joined with class/course names and sorted by date
+    if choice == "1":
+        schedule_data = get_lecturer_schedule(lecturer_id, *week_range())
+    elif choice == "2":
+        schedule_data = get_lecturer_schedule(lecturer_id, *day_range())
+    elif choice == "3":
+        schedule_data = get_lecturer_next_sessions(lecturer_id, 10)
+    else:
+        schedule_data = get_lecturer_schedule(lecturer_id)
 
-    if not lecturer_sessions:
+    if not schedule_data:
         print("Khong co buoi hoc nao trong lich.")
         input("\nNhan Enter de quay lai...")
         return
 
-    # Build schedule data
-    schedule_data = []
-    for sess in lecturer_sessions:
-        class_id = sess.get("class_id")
-        class_info = next((c for c in lecturer_classes if c["id"] == class_id), None)
-
-        if class_info:
-            course_id = class_info.get("course_id")
-            course_name = course_map.get(course_id, "Unknown")
-            class_name = class_info.get("name", "")
-        else:
-            course_name = "Unknown"
-            class_name = ""
-
-        schedule_data.append({
-            "session_id": sess.get("id", ""),
-            "date": sess.get("date_str", ""),
-            "time": sess.get("time_str", ""),
-            "course_name": course_name,
-            "class_name": class_name,
-            "room": sess.get("room", ""),
-            "week": sess.get("week", ""),
-            "status": sess.get("status", "")
-        })
-
-    # Sort by date
-    schedule_data.sort(key=lambda x: x['date'])
-
     # Display schedule
     print(f"{'Ma buoi':<10} | {'Ngay':<12} | {'Gio':<8} | {'Mon hoc':<25} | {'Lop':<10} | {'Phong':<10} | {'Status':<10}")
     print("-" * 110)
@@ -82,17 +57,12 @@ def handle_take_attendance(current_user):
     lecturer_id = current_user.user_id
 
     # Show lecturer's upcoming/open sessions
-    all_classes = load_classes()
-    lecturer_classes = [c for c in all_classes if c.get("lecturer_id") == lecturer_id]
-
-    if not lecturer_classes:
+    if not get_lecturer_classes(lecturer_id):
         print("Ban khong co lop hoc nao duoc phan cong.")
         input("\nNhan Enter de quay lai...")
         return
 
-    all_sessions = load_sessions()
-    class_ids = [c["id"] for c in lecturer_classes]
-    lecturer_sessions = [s for s in all_sessions if s.get("class_id") in class_ids]
+    lecturer_sessions = get_lecturer_schedule(lecturer_id)
 
     if not lecturer_sessions:
         print("Khong co buoi hoc nao trong lich.")
@@ -105,7 +75,7 @@ def handle_take_attendance(current_user):
     print("-" * 60)
 
     for sess in lecturer_sessions:
-        print(f"{sess.get('id', ''):<10} | {sess.get('date_str', ''):<12} | {sess.get('time_str', ''):<8} | {sess.get('room', ''):<10} | {sess.get('status', ''):<10}")
+        print(f"{sess['session_id']:<10} | {sess['date']:<12} | {sess['time']:<8} | {sess['room']:<10} | {sess['status']:<10}")
 
     print("-" * 60)
 
@@ -117,7 +87,7 @@ def handle_take_attendance(current_user):
         return
 
     # Verify this session belongs to the lecturer
-    if session_id not in [s.get("id") for s in lecturer_sessions]:
+    if session_id not in {s["session_id"] for s in lecturer_sessions}:
         print(f"[ERROR] Buoi hoc {session_id} khong thuoc ve ban.")
         input("Nhan Enter de quay lai...")
         return
@@ -158,13 +128,19 @@ def handle_review_corrections(current_user):
 
     print("-" * 80)
 
-    # Ask which request to process
-    request_id = input("\nNhap ma yeu cau de xu ly (hoac Enter de huy): ").strip()
+    # Ask which request(s) to process
+    print("\nNhap 1 ma yeu cau, nhieu ma cach nhau bang dau phay,")
+    print("hoac 'all' de xu ly tat ca yeu cau dang cho duyet.")
+    request_id = input("Lua chon (hoac Enter de huy): ").strip()
     if not request_id:
         print("Huy xu ly.")
         input("Nhan Enter de quay lai...")
         return
 
+    if request_id.lower() == "all" or "," in request_id:
+        handle_review_corrections_batch(correction_service, lecturer_id, request_id)
+        return
+
     # Find the request
     request = next((r for r in pending_requests if r.request_id == request_id), None)
     if not request:
@@ -205,6 +181,45 @@ def handle_review_corrections(current_user):
     input("\nNhan Enter de quay lai...")
 
 
+def handle_review_corrections_batch(correction_service, lecturer_id, selection):
+    """Approve or reject several pending requests in one step."""
+    if selection.lower() == "all":
+        session_id = input("Chi xu ly yeu cau cua buoi hoc (Enter = tat ca): ").strip() or None
+        request_ids = [r.request_id for r in correction_service.list_pending_requests(lecturer_id, session_id)]
+    else:
+        pending_ids = {r.request_id for r in correction_service.list_pending_requests(lecturer_id)}
+        request_ids = [rid.strip() for rid in selection.split(",") if rid.strip()]
+        unknown = [rid for rid in request_ids if rid not in pending_ids]
+        if unknown:
+            print(f"[ERROR] Khong tim thay yeu cau: {', '.join(unknown)}")
+            request_ids = [rid for rid in request_ids if rid in pending_ids]
+
+    if not request_ids:
+        print("Khong co yeu cau nao de xu ly.")
+        input("\nNhan Enter de quay lai...")
+        return
+
+    print(f"\nSe xu ly {len(request_ids)} yeu cau.")
+    print("(1) Duyet tat ca")
+    print("(2) Tu choi tat ca")
+    print("(0) Huy")
+
+    choice = input("Lua chon cua ban: ").strip()
+
+    if choice == "1":
+        note = input("Ghi chu (optional): ").strip()
+        done = correction_service.approve_requests(request_ids, note)
+        print(f"\n[OK] Da duyet {len(done)}/{len(request_ids)} yeu cau.")
+    elif choice == "2":
+        note = input("Ghi chu (optional): ").strip()
+        done = correction_service.reject_requests(request_ids, note)
+        print(f"\n[OK] Da tu choi {len(done)}/{len(request_ids)} yeu cau.")
+    else:
+        print("Huy xu ly.")
+
+    input("\nNhan Enter de quay lai...")
+
+
 def handle_generate_report(current_user):
     """Generate attendance report for a class."""
     print("\n" + "="*80)
@@ -214,8 +229,7 @@ def handle_generate_report(current_user):
     lecturer_id = current_user.user_id
 
     # Show lecturer's classes
-    all_classes = load_classes()
-    lecturer_classes = [c for c in all_classes if c.get("lecturer_id") == lecturer_id]
+    lecturer_classes = get_lecturer_classes(lecturer_id)
 
     if not lecturer_classes:
         print("Ban khong co lop hoc nao duoc phan cong.")
@@ -276,39 +290,9 @@ def handle_generate_report(current_user):
 
 def get_students_in_session_by_class(class_id):
     """Helper to get all students in a class (not session-specific)."""
-    import os
-    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
-    cs_path = os.path.join(data_dir, "class_student.txt")
-    users_path = os.path.join(data_dir, "users.txt")
-
-    student_ids = []
-    try:
-        with open(cs_path, "r", encoding="utf-8") as fh:
-            for raw in fh:
-                line = raw.strip()
-                if not line:
-                    continue
-                parts = [p.strip() for p in line.split(",")]
-                if parts[0] == class_id and len(parts) > 1:
-                    student_ids.append(parts[1])
-    except FileNotFoundError:
-        return []
-
-    # Build id->name map
-    id_name = {}
-    try:
-        with open(users_path, "r", encoding="utf-8") as fh:
-            for raw in fh:
-                line = raw.strip()
-                if not line:
-                    continue
-                parts = [p.strip() for p in line.split(",")]
-                if len(parts) >= 2:
-                    id_name[parts[0]] = parts[1]
-    except FileNotFoundError:
-        pass
-
-    return [(sid, id_name.get(sid, "")) for sid in student_ids]
+    id_name = get_user_names()
+
+    return [(sid, id_name.get(sid, "")) for sid in get_class_students(class_id)]
 
 
 def lecturer_menu(current_user):
@@ -1,4 +1,7 @@
-from services.timetable_service import get_student_timetable, load_courses, load_classes, get_session_by_id
+from services.timetable_service import (
+    get_student_schedule, get_student_next_sessions, get_student_timetable, get_student_classes, get_class_by_id, get_session_by_id,
+    day_range, week_range
+)
 from services.attendance_service import student_checkin, get_student_history
 from services.correction_service import CorrectionService
 def handle_view_timetable(current_user):
@@ -6,52 +9,41 @@ def handle_view_timetable(current_user):
 
     student_id = current_user.user_id
 
-    # Load real data from timetable_service
-    sessions = get_student_timetable(student_id)
-
-    if not sessions:
+    if not get_student_classes(student_id):
         print("Ban khong co lich hoc nao.")
         print("-" * 80)
         input("\nNhan Enter de quay lai...")
         return
 
-    # Load courses and classes to join with session data
-    courses = load_courses()
-    classes = load_classes()
-
-    # Create lookup maps
-    course_map = {c["id"]: c["name"] for c in courses}
-    class_map = {cl["id"]: cl for cl in classes}
-
-    # Build schedule data with course names
-    schedule_data = []
-    for sess in sessions:
-        class_id = sess.get("class_id")
-        class_info = class_map.get(class_id)
-
-        if class_info:
-            course_id = class_info.get("course_id")
-            course_name = course_map.get(course_id, "Unknown")
-        else:
-            course_name = "Unknown"
-
-        schedule_data.append({
-            "date": sess.get("date_str", ""),
-            "time": sess.get("time_str", ""),
-            "course_name": course_name,
-            "room": sess.get("room", ""),
-            "week": sess.get("week", "")
-        })
+    print("(1) Tuan nay  (2) Hom nay  (3) 5 buoi sap toi  (4) Ca hoc ky")
+    choice = input("Chon pham vi (Enter = tuan nay): ").strip() or "1"
+
+    # Timetable rows already joined with course names and sorted by date
+    if choice == "2":
+        range_name = "hom nay"
+        schedule_data = get_student_schedule(student_id, *day_range())
+    elif choice == "3":
+        range_name = "5 buoi sap toi"
+        schedule_data = get_student_next_sessions(student_id, 5)
+    elif choice == "4":
+        range_name = "ca hoc ky"
+        schedule_data = get_student_schedule(student_id)
+    else:
+        range_name = "tuan nay"
+        schedule_data = get_student_schedule(student_id, *week_range())
 
-    # Sort by date
-    schedule_data.sort(key=lambda x: x['date'])
+    if not schedule_data:
+        print(f"Khong co buoi hoc nao trong pham vi da chon ({range_name}).")
+        print("-" * 80)
+        input("\nNhan Enter de quay lai...")
+        return
 
-    # Display timetable: Time – Course – Room – Week
-    print(f"{'Thoi gian':<10} | {'Mon hoc':<25} | {'Phong':<12} | {'Tuan':<10}")
+    # Display timetable: Date – Time – Course – Room – Week
+    print(f"{'Ngay':<12} | {'Thoi gian':<10} | {'Mon hoc':<25} | {'Phong':<12} | {'Tuan':<10}")
     print("-" * 80)
 
     for item in schedule_data:
-        print(f"{item['time']:<10} | {item['course_name']:<25} | {item['room']:<12} | {item['week']:<10}")
+        print(f"{item['date']:<12} | {item['time']:<10} | {item['course_name']:<25} | {item['room']:<12} | {item['week']:<10}")
 
     print("-" * 80)
     input("\nNhan Enter de quay lai...")
@@ -170,8 +162,7 @@ def handle_submit_correction(current_user):
         return
 
     # Get lecturer from session's class
-    classes = load_classes()
-    class_info = next((c for c in classes if c["id"] == session["class_id"]), None)
+    class_info = get_class_by_id(session["class_id"])
     lecturer_id = class_info["lecturer_id"] if class_info else "UNKNOWN"
 
     # Ask for reason
@@ -1,10 +1,15 @@
+import sys
 from enum import Enum
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
 
 
 TIME_FMT = "%Y-%m-%d %H:%M"
 
+# Mốc tính thời gian check-in dạng số phút (naive, không timezone)
+_EPOCH = datetime(1970, 1, 1)
+_MINUTE = timedelta(minutes=1)
+
 
 class AttendanceState(Enum):
     """Enum trạng thái điểm danh"""
@@ -13,7 +18,101 @@ class AttendanceState(Enum):
     ABSENT = "Absent"
 
 
+# Mã số nguyên của từng trạng thái (dùng trong AttendanceRecord)
+_STATES = tuple(AttendanceState)
+_STATE_CODE = {s: i for i, s in enumerate(_STATES)}
+
+
+def _to_epoch_minute(value: Optional[datetime]) -> Optional[int]:
+    """datetime -> số phút kể từ 1970-01-01 (bỏ giây, giống TIME_FMT)"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return (value - _EPOCH) // _MINUTE
+
+
+# Tra cứu state theo chuỗi trong file (không phân biệt hoa thường)
+_STATE_BY_NAME = {s.value: i for i, s in enumerate(_STATES)}
+_STATE_BY_NAME.update({s.value.lower(): i for i, s in enumerate(_STATES)})
+_ABSENT_CODE = _STATE_CODE[AttendanceState.ABSENT]
+
+# Cache "YYYY-MM-DD" -> số phút lúc 00:00 của ngày đó, và cache cả chuỗi
+# "YYYY-MM-DD HH:MM" (check-in thường dồn vào vài phút đầu mỗi buổi học)
+_DAY_MINUTES: Dict[str, int] = {}
+_DAY_CACHE_LIMIT = 100_000
+_MINUTE_CACHE: Dict[str, int] = {}
+_MINUTE_CACHE_LIMIT = 200_000
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+_intern = sys.intern
+
+
+def _parse_state(state_str: str) -> int:
+    code = _STATE_BY_NAME.get(state_str)
+    if code is None:
+        code = _STATE_BY_NAME.get(state_str.lower(), _ABSENT_CODE)  # Default: Absent
+    return code
+
+
+def _day_minutes(day_str: str) -> Optional[int]:
+    """"YYYY-MM-DD" -> số phút lúc 00:00 của ngày đó (có cache)"""
+    day = _DAY_MINUTES.get(day_str)
+    if day is None:
+        try:
+            day = (date.fromisoformat(day_str).toordinal() - _EPOCH_ORDINAL) * 1440
+        except ValueError:
+            return None
+        if len(_DAY_MINUTES) >= _DAY_CACHE_LIMIT:
+            _DAY_MINUTES.clear()
+        _DAY_MINUTES[day_str] = day
+    return day
+
+
+def _parse_minute(time_str: str) -> Optional[int]:
+    """Chuỗi thời gian trong file -> số phút kể từ 1970, None nếu không đọc được.
+
+    Định dạng chuẩn "%Y-%m-%d %H:%M" được tra cache hoặc cắt chuỗi trực tiếp;
+    các định dạng khác mới dùng strptime / fromisoformat.
+    """
+    minute = _MINUTE_CACHE.get(time_str)
+    if minute is not None or not time_str:
+        return minute
+    if (len(time_str) == 16 and time_str[10] == " " and time_str[13] == ":"
+            and time_str[11:13].isdigit() and time_str[14:16].isdigit()):
+        hour = int(time_str[11:13])
+        minute = int(time_str[14:16])
+        if hour < 24 and minute < 60:
+            day = _day_minutes(time_str[:10])
+            if day is not None:
+                value = day + hour * 60 + minute
+                if len(_MINUTE_CACHE) >= _MINUTE_CACHE_LIMIT:
+                    _MINUTE_CACHE.clear()
+                _MINUTE_CACHE[time_str] = value
+                return value
+
+    # Định dạng khác: đường chậm như trước
+    try:
+        return _to_epoch_minute(datetime.strptime(time_str, TIME_FMT))
+    except ValueError:
+        # Thử format khác nếu có
+        try:
+            return _to_epoch_minute(datetime.fromisoformat(time_str))
+        except ValueError:
+            return None
+
+
 class AttendanceRecord:
+    """Một bản ghi điểm danh, lưu gọn để giữ được hàng triệu bản ghi trong bộ nhớ.
+
+    - ``__slots__`` thay cho ``__dict__``
+    - student_id / session_id được intern (lặp lại rất nhiều lần)
+    - state lưu dạng số nguyên, check_in_time lưu dạng số phút kể từ 1970
+      và chỉ tạo ``datetime`` khi được truy cập
+    """
+
+    __slots__ = ("record_id", "student_id", "session_id", "_minute", "_state", "note")
+
     def __init__(
         self,
         record_id: str,
@@ -24,17 +123,36 @@ class AttendanceRecord:
         note: Optional[str] = None,
     ):
         self.record_id = record_id
-        self.student_id = student_id
-        self.session_id = session_id
-        self.check_in_time = check_in_time
-        self.state = state
+        self.student_id = sys.intern(student_id)
+        self.session_id = sys.intern(session_id)
+        self._minute = _to_epoch_minute(check_in_time)
+        self._state = _STATE_CODE[state]
         self.note = note or ""
+
+    @property
+    def check_in_time(self) -> Optional[datetime]:
+        if self._minute is None:
+            return None
+        return _EPOCH + timedelta(minutes=self._minute)
+
+    @check_in_time.setter
+    def check_in_time(self, value: Optional[datetime]) -> None:
+        self._minute = _to_epoch_minute(value)
+
+    @property
+    def state(self) -> AttendanceState:
+        return _STATES[self._state]
+
+    @state.setter
+    def state(self, value: AttendanceState) -> None:
+        self._state = _STATE_CODE[value]
     
     def to_line(self) -> str:
         # Format thời gian
         time_str = ""
-        if self.check_in_time:
-            time_str = self.check_in_time.strftime(TIME_FMT)
+        check_in_time = self.check_in_time
+        if check_in_time:
+            time_str = check_in_time.strftime(TIME_FMT)
         
         # Xử lý note (thay dấu phẩy bằng dấu chấm phẩy để tránh lỗi CSV)
         note_clean = self.note.replace(",", ";").replace("\n", " ")
@@ -46,36 +164,49 @@ class AttendanceRecord:
         parts = line.strip().split(",")
         
         # Đảm bảo có đủ 6 phần (padding nếu thiếu)
-        while len(parts) < 6:
-            parts.append("")
-        
-        record_id = parts[0].strip()
-        student_id = parts[1].strip()
-        session_id = parts[2].strip()
-        time_str = parts[3].strip()
-        state_str = parts[4].strip()
-        note = parts[5].strip()
-        
-        # Parse thời gian
-        check_in_time = None
-        if time_str:
-            try:
-                check_in_time = datetime.strptime(time_str, TIME_FMT)
-            except ValueError:
-                # Thử format khác nếu có
-                try:
-                    check_in_time = datetime.fromisoformat(time_str)
-                except:
-                    pass
-        
-        # Parse state
-        state = AttendanceState.ABSENT  # Default
-        for s in AttendanceState:
-            if s.value.lower() == state_str.lower():
-                state = s
-                break
+        if len(parts) < 6:
+            parts.extend([""] * (6 - len(parts)))
         
-        return cls(record_id, student_id, session_id, check_in_time, state, note)
+        # Tạo object trực tiếp, không qua __init__ (đã có sẵn số phút và mã state)
+        record = cls.__new__(cls)
+        record.record_id = parts[0].strip()
+        record.student_id = _intern(parts[1].strip())
+        record.session_id = _intern(parts[2].strip())
+        record._minute = _parse_minute(parts[3].strip())
+        record._state = _parse_state(parts[4].strip())
+        record.note = parts[5].strip()
+        return record
+    
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> List["AttendanceRecord"]:
+        """Parse nhiều dòng một lượt, bỏ qua dòng trống.
+
+        Cùng logic với from_line nhưng gộp trong một vòng lặp với các hàm
+        được gán vào biến cục bộ, tránh chi phí gọi hàm cho từng dòng.
+        """
+        new = cls.__new__
+        intern = _intern
+        parse_minute = _parse_minute
+        state_by_name = _STATE_BY_NAME
+        records = []
+        append = records.append
+        for line in lines:
+            parts = line.strip().split(",")
+            if len(parts) < 6:
+                if not parts[0]:
+                    continue
+                parts.extend([""] * (6 - len(parts)))
+            record = new(cls)
+            record.record_id = parts[0].strip()
+            record.student_id = intern(parts[1].strip())
+            record.session_id = intern(parts[2].strip())
+            record._minute = parse_minute(parts[3].strip())
+            state_str = parts[4].strip()
+            code = state_by_name.get(state_str)
+            record._state = code if code is not None else _parse_state(state_str)
+            record.note = parts[5].strip()
+            append(record)
+        return records
     
     def __repr__(self) -> str:
         return (
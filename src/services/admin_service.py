@@ -1,12 +1,58 @@
-import os
-from typing import List, Optional
+from typing import Callable, List, Optional
+
+from models.user import User
+from services.passwords import hash_password
+from services.repository import append_lines, compact_records, locked, next_sequence, tombstone_line, write_lines
+from services.timetable_service import (
+    CLASS_FIELDS, COURSE_FIELDS, SESSION_STATUS_FILE, compact_session_statuses, get_class_by_id,
+    get_course_by_id, load_courses, load_classes, max_record_number, record_line_counts
+)
+from services import user_directory
+from services.user_directory import USER_FIELDS, find_by_email, format_user, make_user, max_user_number
+
+# Adds append one line and deletes append a tombstone line ("<id>,#deleted"),
+# so neither rewrites the file. New ids come from persisted counters. A file
+# is compacted when its dead lines outnumber both COMPACT_MIN_STALE and its
+# live records, or on demand with compact_data_files().
+COMPACT_MIN_STALE = 1000
+
+
+def _append_record(filename: str, build_line: Callable[[], Optional[str]]) -> bool:
+    """Append the line returned by ``build_line``, or nothing if it returns None.
+
+    ``build_line`` runs under the file's lock, so its checks and id
+    allocation cannot race with another add, delete or compaction.
+    """
+    try:
+        with locked(filename.split(".")[0]):
+            line = build_line()
+            if line is None:
+                return False
+            append_lines(filename, [line])
+        return True
+    except Exception as e:
+        print(f"[ERROR] Failed to write {filename}: {e}")
+        return False
+
 
-from models.user import User, Student, Lecturer, Admin
+def _compact(filename: str, min_fields: int) -> int:
+    with locked(filename.split(".")[0]):
+        return compact_records(filename, min_fields)
 
-def _data_path(filename: str) -> str:
-    """Get absolute path to data file."""
-    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
-    return os.path.join(root, filename)
+
+def _delete_record(filename: str, record_id: str, label: str, exists, min_fields: int, line_counts) -> bool:
+    def tombstone() -> Optional[str]:
+        if not exists(record_id):
+            print(f"[ERROR] {label} {record_id} not found.")
+            return None
+        return tombstone_line(record_id)
+
+    if not _append_record(filename, tombstone):
+        return False
+    lines, live = line_counts()
+    if lines - live > max(COMPACT_MIN_STALE, live):
+        _compact(filename, min_fields)
+    return True
 
 
 # ============================================================================
@@ -14,39 +60,15 @@ def _data_path(filename: str) -> str:
 # ============================================================================
 
 def list_users() -> List[User]:
-    """Load and return all users from users.txt."""
-    users = []
-    path = _data_path("users.txt")
-
-    if not os.path.exists(path):
-        return users
-
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split(",")
-            if len(parts) >= 5:
-                user_id, name, email, password, role = parts[0], parts[1], parts[2], parts[3], parts[4]
-                if role == "student":
-                    users.append(Student(user_id, name, email, password))
-                elif role == "lecturer":
-                    users.append(Lecturer(user_id, name, email, password))
-                elif role == "admin":
-                    users.append(Admin(user_id, name, email, password))
-                else:
-                    users.append(User(user_id, name, email, password, role))
-    return users
+    """Return all users from users.txt."""
+    return user_directory.list_users()
 
 
 def save_users(users: List[User]) -> bool:
     """Save all users to users.txt."""
-    path = _data_path("users.txt")
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            for u in users:
-                f.write(f"{u.id},{u.name},{u.email},{u.password},{u.role}\n")
+        with locked("users"):
+            write_lines("users.txt", (format_user(u) for u in users))
         return True
     except Exception as e:
         print(f"[ERROR] Failed to save users: {e}")
@@ -55,53 +77,31 @@ def save_users(users: List[User]) -> bool:
 
 def add_user(name: str, email: str, password: str, role: str) -> bool:
     """Add a new user to the system."""
-    users = list_users()
-
-    # Check for duplicate email
-    for u in users:
-        if u.email == email:
-            print(f"[ERROR] Email {email} already exists.")
-            return False
-
     # Validate role
     if role not in ["student", "lecturer", "admin"]:
         print(f"[ERROR] Invalid role: {role}")
         return False
 
-    # Generate new user ID
-    max_id = 0
-    for u in users:
-        if u.id.startswith("U") and u.id[1:].isdigit():
-            num = int(u.id[1:])
-            if num > max_id:
-                max_id = num
-    new_id = f"U{max_id + 1:03d}"
-
-    # Create user object
-    if role == "student":
-        new_user = Student(new_id, name, email, password)
-    elif role == "lecturer":
-        new_user = Lecturer(new_id, name, email, password)
-    elif role == "admin":
-        new_user = Admin(new_id, name, email, password)
-    else:
-        new_user = User(new_id, name, email, password, role)
+    # Hash outside the lock: it is the slow part
+    password = hash_password(password)
 
-    users.append(new_user)
-    return save_users(users)
+    def new_user_line() -> Optional[str]:
+        # Check for duplicate email
+        if find_by_email(email) is not None:
+            print(f"[ERROR] Email {email} already exists.")
+            return None
 
+        # Generate new user ID
+        new_id = f"U{next_sequence('users', floor=max_user_number()):03d}"
+        return format_user(make_user(new_id, name, email, password, role))
 
-def delete_user(user_id: str) -> bool:
-    """Delete a user by ID."""
-    users = list_users()
-    original_count = len(users)
-    users = [u for u in users if u.id != user_id]
+    return _append_record("users.txt", new_user_line)
 
-    if len(users) == original_count:
-        print(f"[ERROR] User {user_id} not found.")
-        return False
 
-    return save_users(users)
+def delete_user(user_id: str) -> bool:
+    """Delete a user by ID."""
+    return _delete_record("users.txt", user_id, "User", lambda uid: user_directory.get_user(uid) is not None,
+                          USER_FIELDS, user_directory.line_counts)
 
 
 # ============================================================================
@@ -110,34 +110,14 @@ def delete_user(user_id: str) -> bool:
 
 def list_courses() -> List[dict]:
     """Load and return all courses from courses.txt."""
-    courses = []
-    path = _data_path("courses.txt")
-
-    if not os.path.exists(path):
-        return courses
-
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split(",")
-            if len(parts) >= 3:
-                courses.append({
-                    "id": parts[0].strip(),
-                    "name": parts[1].strip(),
-                    "credits": parts[2].strip()
-                })
-    return courses
+    return list(load_courses())
 
 
 def save_courses(courses: List[dict]) -> bool:
     """Save all courses to courses.txt."""
-    path = _data_path("courses.txt")
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            for c in courses:
-                f.write(f"{c['id']},{c['name']},{c['credits']}\n")
+        with locked("courses"):
+            write_lines("courses.txt", (f"{c['id']},{c['name']},{c['credits']}" for c in courses))
         return True
     except Exception as e:
         print(f"[ERROR] Failed to save courses: {e}")
@@ -146,39 +126,18 @@ def save_courses(courses: List[dict]) -> bool:
 
 def add_course(name: str, credits: str) -> bool:
     """Add a new course to the system."""
-    courses = list_courses()
+    def new_course_line() -> str:
+        # Generate new course ID
+        new_id = f"C{next_sequence('courses', floor=max_record_number('courses.txt')):03d}"
+        return f"{new_id},{name},{credits}"
 
-    # Generate new course ID
-    max_id = 0
-    for c in courses:
-        cid = c["id"]
-        if cid.startswith("C") and cid[1:].isdigit():
-            num = int(cid[1:])
-            if num > max_id:
-                max_id = num
-    new_id = f"C{max_id + 1:03d}"
-
-    new_course = {
-        "id": new_id,
-        "name": name,
-        "credits": credits
-    }
-
-    courses.append(new_course)
-    return save_courses(courses)
+    return _append_record("courses.txt", new_course_line)
 
 
 def delete_course(course_id: str) -> bool:
     """Delete a course by ID."""
-    courses = list_courses()
-    original_count = len(courses)
-    courses = [c for c in courses if c["id"] != course_id]
-
-    if len(courses) == original_count:
-        print(f"[ERROR] Course {course_id} not found.")
-        return False
-
-    return save_courses(courses)
+    return _delete_record("courses.txt", course_id, "Course", lambda cid: get_course_by_id(cid) is not None,
+                          COURSE_FIELDS, lambda: record_line_counts("courses.txt"))
 
 
 # ============================================================================
@@ -187,36 +146,16 @@ def delete_course(course_id: str) -> bool:
 
 def list_classes() -> List[dict]:
     """Load and return all classes from classes.txt."""
-    classes = []
-    path = _data_path("classes.txt")
-
-    if not os.path.exists(path):
-        return classes
-
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split(",")
-            if len(parts) >= 5:
-                classes.append({
-                    "id": parts[0].strip(),
-                    "name": parts[1].strip(),
-                    "semester": parts[2].strip(),
-                    "course_id": parts[3].strip(),
-                    "lecturer_id": parts[4].strip()
-                })
-    return classes
+    return list(load_classes())
 
 
 def save_classes(classes: List[dict]) -> bool:
     """Save all classes to classes.txt."""
-    path = _data_path("classes.txt")
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            for c in classes:
-                f.write(f"{c['id']},{c['name']},{c['semester']},{c['course_id']},{c['lecturer_id']}\n")
+        with locked("classes"):
+            write_lines("classes.txt", (
+                f"{c['id']},{c['name']},{c['semester']},{c['course_id']},{c['lecturer_id']}" for c in classes
+            ))
         return True
     except Exception as e:
         print(f"[ERROR] Failed to save classes: {e}")
@@ -225,41 +164,31 @@ def save_classes(classes: List[dict]) -> bool:
 
 def add_class(name: str, semester: str, course_id: str, lecturer_id: str) -> bool:
     """Add a new class to the system."""
-    classes = list_classes()
-
-    # Generate new class ID
-    max_id = 0
-    for c in classes:
-        cid = c["id"]
-        if cid.startswith("CL") and cid[2:].isdigit():
-            num = int(cid[2:])
-            if num > max_id:
-                max_id = num
-    new_id = f"CL{max_id + 1:03d}"
-
-    new_class = {
-        "id": new_id,
-        "name": name,
-        "semester": semester,
-        "course_id": course_id,
-        "lecturer_id": lecturer_id
-    }
+    def new_class_line() -> str:
+        # Generate new class ID
+        new_id = f"CL{next_sequence('classes', floor=max_record_number('classes.txt')):03d}"
+        return f"{new_id},{name},{semester},{course_id},{lecturer_id}"
 
-    classes.append(new_class)
-    return save_classes(classes)
+    return _append_record("classes.txt", new_class_line)
 
 
 def delete_class(class_id: str) -> bool:
     """Delete a class by ID."""
-    classes = list_classes()
-    original_count = len(classes)
-    classes = [c for c in classes if c["id"] != class_id]
+    return _delete_record("classes.txt", class_id, "Class", lambda cid: get_class_by_id(cid) is not None,
+                          CLASS_FIELDS, lambda: record_line_counts("classes.txt"))
 
-    if len(classes) == original_count:
-        print(f"[ERROR] Class {class_id} not found.")
-        return False
 
-    return save_classes(classes)
+def compact_data_files() -> dict:
+    """Compact users.txt, courses.txt and classes.txt, and fold session_status.txt into sessions.txt.
+
+    Returns file name -> number of lines removed.
+    """
+    return {
+        "users.txt": _compact("users.txt", USER_FIELDS),
+        "courses.txt": _compact("courses.txt", COURSE_FIELDS),
+        "classes.txt": _compact("classes.txt", CLASS_FIELDS),
+        SESSION_STATUS_FILE: compact_session_statuses(),
+    }
 
 
 # ============================================================================
@@ -268,20 +197,27 @@ def delete_class(class_id: str) -> bool:
 
 def get_system_statistics() -> dict:
     """Get basic system statistics."""
-    users = list_users()
     courses = list_courses()
     classes = list_classes()
 
-    # Count users by role
-    student_count = sum(1 for u in users if u.role == "student")
-    lecturer_count = sum(1 for u in users if u.role == "lecturer")
-    admin_count = sum(1 for u in users if u.role == "admin")
+    # Count users by role from the directory's role index
+    role_counts = user_directory.count_by_role()
 
     return {
-        "total_users": len(users),
-        "students": student_count,
-        "lecturers": lecturer_count,
-        "admins": admin_count,
+        "total_users": sum(role_counts.values()),
+        "students": role_counts.get("student", 0),
+        "lecturers": role_counts.get("lecturer", 0),
+        "admins": role_counts.get("admin", 0),
         "total_courses": len(courses),
         "total_classes": len(classes)
     }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["compact"]:
+        for filename, removed in compact_data_files().items():
+            print(f"[OK] {filename}: {removed} line(s) removed")
+    else:
+        print("Usage: python -m services.admin_service compact")
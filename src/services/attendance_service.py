@@ -1,75 +1,295 @@
-import os
-from datetime import datetime, timedelta
-from typing import List, Optional
+import threading
+from datetime import date, datetime, timedelta
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Optional, Tuple
 
 try:
     # package-style imports when running `python -m src.main`
     from src.models.attendance import AttendanceRecord, AttendanceState, TIME_FMT
+    from src.services.repository import (
+        append_lines, iter_lines, load_incremental, locked, next_sequence, select_is_indexed, select_lines
+    )
     from src.services.timetable_service import get_session_by_id, get_students_in_session
 except Exception:
     # script-style imports when running `python main.py` from inside src/
     from models.attendance import AttendanceRecord, AttendanceState, TIME_FMT
+    from services.repository import (
+        append_lines, iter_lines, load_incremental, locked, next_sequence, select_is_indexed, select_lines
+    )
     from services.timetable_service import get_session_by_id, get_students_in_session
 
 
-def _data_path(filename: str) -> str:
-    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
-    return os.path.join(root, filename)
+# Approved corrections are not patched into attendance.txt: each one appends
+# "record_id,state,updated_at,note" to attendance_overrides.txt, and readers
+# apply the latest override of a record on top of its original line.
+ATTENDANCE_OVERRIDES_FILE = "attendance_overrides.txt"
 
+_STATE_BY_VALUE = {s.value.lower(): s for s in AttendanceState}
 
-def _next_record_id() -> str:
-    path = _data_path("attendance.txt")
-    try:
-        with open(path, "r", encoding="utf-8") as fh:
-            max_num = 0
-            for line in fh:
-                parts = line.strip().split(",")
-                if not parts:
+
+def _feed_overrides(overrides: dict, lines) -> None:
+    for line in lines:
+        parts = line.split(",", 3)
+        state = _STATE_BY_VALUE.get(parts[1].strip().lower()) if len(parts) > 1 else None
+        if state is None:
+            continue
+        note = parts[3].strip() if len(parts) > 3 else ""
+        overrides[parts[0].strip()] = (state, note)
+
+
+def _attendance_overrides() -> Dict[str, Tuple[AttendanceState, str]]:
+    """record_id -> (state, note) of the latest override."""
+    return load_incremental(ATTENDANCE_OVERRIDES_FILE, dict, _feed_overrides)
+
+
+def update_attendance_states(updates: Iterable[Tuple[str, AttendanceState, str]]) -> int:
+    """Change the state of existing records with a single append.
+
+    Args:
+        updates: (record_id, new state, note) tuples
+
+    Returns the number of records updated.
+    """
+    stamp = datetime.now().strftime(TIME_FMT)
+    lines = []
+    for record_id, state, note in updates:
+        # Same cleaning as AttendanceRecord.to_line
+        note_clean = (note or "").replace(",", ";").replace("\n", " ")
+        lines.append(f"{record_id},{state.value},{stamp},{note_clean}")
+    append_lines(ATTENDANCE_OVERRIDES_FILE, lines)
+    return len(lines)
+
+
+def iter_attendance_records(
+    student_id: Optional[str] = None,
+    session_ids: Optional[AbstractSet[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Iterator[AttendanceRecord]:
+    """Stream records from attendance.txt, optionally filtered.
+
+    Approved corrections (attendance_overrides.txt) are applied to the
+    records they target.
+
+    Filters are applied to the raw fields before a line is parsed, so lines
+    that do not match never pay for AttendanceRecord.from_line. The date range
+    is inclusive and compares the check-in date; records without a check-in
+    time are skipped when a date filter is given.
+    """
+    day_from = date_from.strftime("%Y-%m-%d") if date_from else None
+    day_to = date_to.strftime("%Y-%m-%d") if date_to else None
+    filtered = student_id is not None or session_ids is not None or day_from or day_to
+
+    overrides = _attendance_overrides()
+
+    # Let the backend narrow the lines first (an index lookup on SQLite)
+    if student_id is not None:
+        lines = select_lines("attendance.txt", "student_id", [student_id])
+    elif session_ids is not None:
+        lines = select_lines("attendance.txt", "session_id", session_ids)
+    else:
+        lines = iter_lines("attendance.txt")
+
+    for line in lines:
+        if filtered:
+            parts = line.split(",", 5)
+            if len(parts) < 3:
+                continue
+            if student_id is not None and parts[1].strip() != student_id:
+                continue
+            if session_ids is not None and parts[2].strip() not in session_ids:
+                continue
+            if day_from or day_to:
+                day = parts[3].strip()[:10] if len(parts) > 3 else ""
+                if not day or (day_from and day < day_from) or (day_to and day > day_to):
                     continue
-                rid = parts[0]
-                if rid.startswith("A") and rid[1:].isdigit():
-                    num = int(rid[1:])
-                    if num > max_num:
-                        max_num = num
-            return f"A{max_num+1:03d}"
-    except FileNotFoundError:
-        return "A001"
+        try:
+            record = AttendanceRecord.from_line(line)
+        except Exception:
+            continue
+        if overrides:
+            override = overrides.get(record.record_id)
+            if override is not None:
+                record.state = override[0]
+                if override[1]:
+                    record.note = override[1]
+        yield record
 
 
-def student_checkin(student_id: str, session_id: str) -> tuple[bool, str]:
-    sess = get_session_by_id(session_id)
+def _new_checkin_index() -> dict:
+    return {"pairs": set(), "max_num": 0}
+
+
+def _feed_checkin_index(index: dict, lines) -> None:
+    """Track (student_id, session_id) pairs and the highest A### number."""
+    pairs = index["pairs"]
+    max_num = index["max_num"]
+    for line in lines:
+        parts = line.split(",", 3)
+        rid = parts[0]
+        if rid.startswith("A") and rid[1:].isdigit():
+            num = int(rid[1:])
+            if num > max_num:
+                max_num = num
+        if len(parts) >= 3:
+            pairs.add((parts[1], parts[2]))
+    index["max_num"] = max_num
+
+
+def _checkin_index() -> dict:
+    return load_incremental("attendance.txt", _new_checkin_index, _feed_checkin_index)
+
+
+def _checked_in_pairs(session_ids: AbstractSet[str]):
+    """Return a container of the (student_id, session_id) pairs with a record.
+
+    It holds at least the pairs of ``session_ids``. With an indexed backend
+    only those sessions' records are read, so a process's first check-in
+    does not load the whole attendance history; text files have no index,
+    so their pair set is built once per process and then kept up to date.
+    """
+    if not select_is_indexed():
+        return _checkin_index()["pairs"]
+    pairs = set()
+    for line in select_lines("attendance.txt", "session_id", session_ids):
+        parts = line.split(",", 3)
+        if len(parts) >= 3:
+            pairs.add((parts[1], parts[2]))
+    return pairs
+
+
+def has_checked_in(student_id: str, session_id: str) -> bool:
+    """Return True if attendance.txt already has a record for the pair."""
+    return (student_id, session_id) in _checked_in_pairs({session_id})
+
+
+def _allocate_record_numbers(count: int = 1) -> int:
+    """Reserve ``count`` record numbers and return the first one."""
+    # attendance.txt is only scanned for its highest id to seed a missing counter
+    return next_sequence("attendance", floor=lambda: _checkin_index()["max_num"], count=count)
+
+
+# Check-ins count as PRESENT up to this long after the session start
+LATE_AFTER = timedelta(minutes=15)
+
+
+def checkin_state(start: datetime, now: datetime) -> AttendanceState:
+    """State of a check-in made at ``now`` for a session starting at ``start``."""
+    # simple rule: <= start + 15 minutes => PRESENT, else LATE
+    if now <= start + LATE_AFTER:
+        return AttendanceState.PRESENT
+    return AttendanceState.LATE
+
+
+def check_session_open(sess: Optional[dict], session_id: str) -> Optional[str]:
+    """Return why a session does not accept check-ins, or None if it does."""
     if not sess:
-        return False, f"Session {session_id} not found."
+        return f"Session {session_id} not found."
     if sess.get("status", "").lower() != "open":
-        return False, f"Session {session_id} is not open for check-in."
+        return f"Session {session_id} is not open for check-in."
+    return None
+
+
+def _write_checkins_locked(checkins: List[tuple]) -> List[Optional[str]]:
+    """Dedupe, allocate ids and append; the caller holds locked("attendance")."""
+    # Reloaded under the lock, so appends by other processes are seen
+    pairs = _checked_in_pairs({session_id for _student, session_id, _time, _state in checkins})
+    seen = set()
+    accepted = []
+    for i, (student_id, session_id, _time, _state) in enumerate(checkins):
+        pair = (student_id, session_id)
+        if pair not in pairs and pair not in seen:
+            seen.add(pair)
+            accepted.append(i)
+
+    record_ids: List[Optional[str]] = [None] * len(checkins)
+    if not accepted:
+        return record_ids
+
+    next_id_num = _allocate_record_numbers(len(accepted))
+    lines = []
+    for i in accepted:
+        student_id, session_id, check_in_time, state = checkins[i]
+        rid = f"A{next_id_num:03d}"
+        next_id_num += 1
+        lines.append(AttendanceRecord(rid, student_id, session_id, check_in_time, state, None).to_line())
+        record_ids[i] = rid
+    append_lines("attendance.txt", lines, sync=True)
+    return record_ids
+
+
+class _GroupCommit:
+    """Merge check-ins submitted concurrently by this process into one write.
+
+    Each caller queues its batch; whichever thread gets the writer slot
+    takes every queued batch and commits them together (one lock, one
+    append, one fsync), then hands each caller its own results.
+    """
+
+    def __init__(self):
+        self._queue_lock = threading.Lock()
+        self._writer = threading.Lock()
+        self._queue: List[dict] = []
+
+    def submit(self, checkins: List[tuple]) -> List[Optional[str]]:
+        entry = {"checkins": checkins, "result": None, "error": None, "done": False}
+        with self._queue_lock:
+            self._queue.append(entry)
+        with self._writer:
+            if not entry["done"]:
+                with self._queue_lock:
+                    batch, self._queue = self._queue, []
+                combined = [c for queued in batch for c in queued["checkins"]]
+                try:
+                    with locked("attendance"):
+                        results = _write_checkins_locked(combined)
+                except Exception as exc:
+                    for queued in batch:
+                        queued["error"], queued["done"] = exc, True
+                else:
+                    pos = 0
+                    for queued in batch:
+                        n = len(queued["checkins"])
+                        queued["result"], queued["done"] = results[pos:pos + n], True
+                        pos += n
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry["result"]
+
+
+_group_commit = _GroupCommit()
+
+
+def write_checkins(checkins: List[tuple]) -> List[Optional[str]]:
+    """Record a batch of check-ins durably with a single append to attendance.txt.
+
+    Args:
+        checkins: (student_id, session_id, check_in_time, AttendanceState) tuples
+
+    Safe with many threads and processes writing to one data directory:
+    duplicates are re-checked and record ids allocated under
+    ``locked("attendance")``, and concurrent calls in a process share one
+    group commit. Pairs that already have a record (or appear earlier in the
+    batch) are skipped. Returns the new record id for each check-in, None if
+    skipped.
+    """
+    return _group_commit.submit(checkins)
+
+
+def student_checkin(student_id: str, session_id: str) -> tuple[bool, str]:
+    sess = get_session_by_id(session_id)
+    error = check_session_open(sess, session_id)
+    if error:
+        return False, error
 
     # Check if student already checked in for this session
-    path = _data_path("attendance.txt")
-    try:
-        with open(path, "r", encoding="utf-8") as fh:
-            for line in fh:
-                parts = line.strip().split(",")
-                if len(parts) >= 3:
-                    _, sid, sess_id = parts[0], parts[1], parts[2]
-                    if sid == student_id and sess_id == session_id:
-                        return False, "You have already checked in for this session."
-    except FileNotFoundError:
-        pass  # File doesn't exist yet, first record
+    if has_checked_in(student_id, session_id):
+        return False, "You have already checked in for this session."
 
     now = datetime.now()
-    start: datetime = sess["start_datetime"]
-    # simple rule: <= start + 15 minutes => PRESENT, else LATE
-    if now <= start + timedelta(minutes=15):
-        state = AttendanceState.PRESENT
-    else:
-        state = AttendanceState.LATE
+    state = checkin_state(sess["start_datetime"], now)
 
-    rid = _next_record_id()
-    record = AttendanceRecord(rid, student_id, session_id, now, state, None)
-
-    line = record.to_line()
-    with open(path, "a", encoding="utf-8") as fh:
-        fh.write(line + "\n")
+    if write_checkins([(student_id, session_id, now, state)])[0] is None:
+        return False, "You have already checked in for this session."
 
     return True, f"Checked in as {state.value}."
 
@@ -98,53 +318,23 @@ def lecturer_take_attendance(session_id: str) -> None:
             print("Invalid input. Please enter P, L or A.")
 
     # append all records
-    path = _data_path("attendance.txt")
     start: datetime = sess["start_datetime"]
+    with locked("attendance"):
+        next_id_num = _allocate_record_numbers(len(answers))
 
-    # Read all existing records first to get the max ID
-    try:
-        with open(path, "r", encoding="utf-8") as fh:
-            max_num = 0
-            for line in fh:
-                parts = line.strip().split(",")
-                if not parts:
-                    continue
-                rid = parts[0]
-                if rid.startswith("A") and rid[1:].isdigit():
-                    num = int(rid[1:])
-                    if num > max_num:
-                        max_num = num
-            next_id_num = max_num + 1
-    except FileNotFoundError:
-        next_id_num = 1
-
-    # Now write all records with sequential IDs
-    with open(path, "a", encoding="utf-8") as fh:
+        # Now write all records with sequential IDs
+        lines = []
         for sid, resp in answers:
             state = AttendanceState.PRESENT if resp == "P" else AttendanceState.LATE if resp == "L" else AttendanceState.ABSENT
             rid = f"A{next_id_num:03d}"
             next_id_num += 1
             rec = AttendanceRecord(rid, sid, session_id, start if resp != "A" else None, state, None)
-            fh.write(rec.to_line() + "\n")
+            lines.append(rec.to_line())
+        append_lines("attendance.txt", lines, sync=True)
 
 
 def get_student_history(student_id: str) -> tuple[List[AttendanceRecord], dict]:
-    path = _data_path("attendance.txt")
-    out: List[AttendanceRecord] = []
-    try:
-        with open(path, "r", encoding="utf-8") as fh:
-            for raw in fh:
-                line = raw.strip()
-                if not line:
-                    continue
-                try:
-                    rec = AttendanceRecord.from_line(line)
-                except Exception:
-                    continue
-                if rec.student_id == student_id:
-                    out.append(rec)
-    except FileNotFoundError:
-        return [], {"total": 0, "present": 0, "late": 0, "absent": 0, "attendance_pct": 0.0}
+    out: List[AttendanceRecord] = list(iter_attendance_records(student_id=student_id))
     # compute stats
     total = len(out)
     present = sum(1 for r in out if r.state == AttendanceState.PRESENT)
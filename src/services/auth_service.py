@@ -1,48 +1,66 @@
-from models.user import User, Student, Lecturer, Admin
-import os
+from typing import Optional
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
-USERS_FILE = os.path.join(DATA_DIR, "users.txt")
+from models.user import User
+from services.passwords import hash_password, is_hashed, verify_password
+from services.repository import append_lines, locked, next_sequence, write_lines
+from services.user_directory import find_by_email, format_user, list_users, make_user, max_user_number
 
 
 def load_users():
-    users = []
-    if not os.path.exists(USERS_FILE):
-        return users
-
-    with open(USERS_FILE, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:  # Skip empty lines
-                continue
-            user_id, name, email, password, role = line.split(",")
-            if role == "student":
-                users.append(Student(user_id, name, email, password))
-            elif role == "lecturer":
-                users.append(Lecturer(user_id, name, email, password))
-            elif role == "admin":
-                users.append(Admin(user_id, name, email, password))
-            else:
-                users.append(User(user_id, name, email, password, role))
-    return users
+    return list_users()
 
 
 def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        for u in users:
-            f.write(f"{u.id},{u.name},{u.email},{u.password},{u.role}\n")
+    # Cùng lock với đăng ký và admin_service, để không mất dòng ghi thêm
+    with locked("users"):
+        write_lines("users.txt", (format_user(u) for u in users))
+
+
+_dummy_hash = None
+
+
+def authenticate(email: str, password: str) -> Optional[User]:
+    """Return the user with this email and password, or None."""
+    global _dummy_hash
+    user = find_by_email(email)
+    if user is None:
+        # Một email không tồn tại tốn thời gian như một mật khẩu sai
+        if _dummy_hash is None:
+            _dummy_hash = hash_password("")
+        verify_password(password, _dummy_hash)
+        return None
+    if not verify_password(password, user.password):
+        return None
+    return user
+
+
+def hash_stored_passwords() -> int:
+    """Replace the plaintext passwords left in users.txt with salted hashes.
+
+    Returns the number of passwords hashed. Run it once after upgrading:
+        python -m services.auth_service hash-passwords
+    """
+    with locked("users"):
+        users = load_users()
+        plaintext = [u for u in users if not is_hashed(u.password)]
+        if plaintext:
+            hashed = {u.id: hash_password(u.password) for u in plaintext}
+            # Cached users are shared: write copies with the hashed password
+            write_lines("users.txt", (
+                format_user(make_user(u.id, u.name, u.email, hashed[u.id], u.role)) if u.id in hashed
+                else format_user(u)
+                for u in users
+            ))
+    return len(plaintext)
 
 
 def register_user():
-    users = load_users()
     email = input("Nhập email: ").strip()
 
     # Kiểm tra trùng email
-    for u in users:
-        if u.email == email:
-            print("Email đã tồn tại. Vui lòng thử lại.")
-            return
+    if find_by_email(email) is not None:
+        print("Email đã tồn tại. Vui lòng thử lại.")
+        return
 
     # Kiểm tra định dạng email đơn giản
     if "@" not in email or "." not in email:
@@ -58,41 +76,43 @@ def register_user():
     print("3. Admin")
     role_choice = input("Nhập số: ").strip()
 
-    # Generate new user ID (same logic as admin_service.py)
-    max_id = 0
-    for u in users:
-        if u.id.startswith("U") and u.id[1:].isdigit():
-            num = int(u.id[1:])
-            if num > max_id:
-                max_id = num
-    new_id = f"U{max_id + 1:03d}"
-
-    if role_choice == "1":
-        role = "student"
-        new_user = Student(new_id, name, email, password)
-    elif role_choice == "2":
-        role = "lecturer"
-        new_user = Lecturer(new_id, name, email, password)
-    elif role_choice == "3":
-        role = "admin"
-        new_user = Admin(new_id, name, email, password)
-    else:
+    roles = {"1": "student", "2": "lecturer", "3": "admin"}
+    if role_choice not in roles:
         print("Lựa chọn không hợp lệ .")
         return
+    role = roles[role_choice]
+
+    password = hash_password(password)
+
+    # Kiểm tra lại email, cấp ID và ghi thêm trong cùng một lock, để hai
+    # đăng ký đồng thời không tạo trùng email hoặc trùng ID
+    with locked("users"):
+        if find_by_email(email) is not None:
+            print("Email đã tồn tại. Vui lòng thử lại.")
+            return
 
-    users.append(new_user)
-    save_users(users)
+        # Generate new user ID (same counter as admin_service.py)
+        new_id = f"U{next_sequence('users', floor=max_user_number()):03d}"
+        append_lines("users.txt", [format_user(make_user(new_id, name, email, password, role))])
     print(f"Đăng ký thành công! ({role})")
 
 
 def login_user():
-    users = load_users()
     email = input("Email: ").strip()
     password = input("Mật khẩu: ").strip()
 
-    for u in users:
-        if u.email == email and u.password == password:
-            print(f"Đăng nhập thành công! Xin chào {u.name}.")
-            return u
+    u = authenticate(email, password)
+    if u:
+        print(f"Đăng nhập thành công! Xin chào {u.name}.")
+        return u
     print("Sai email hoặc mật khẩu .")
     return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["hash-passwords"]:
+        print(f"[OK] {hash_stored_passwords()} password(s) hashed")
+    else:
+        print("Usage: python -m services.auth_service hash-passwords")
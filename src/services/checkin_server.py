@@ -0,0 +1,213 @@
+"""Long-running check-in service for lecture-start bursts.
+
+Instead of one CLI process per check-in re-reading the data files, the
+service keeps the open sessions and the existing check-ins in memory and
+accepts check-ins over a localhost TCP socket. Accepted check-ins are queued
+and written to attendance.txt in batches (one append per batch): a write
+starts as soon as the previous one is done and takes everything queued
+meanwhile. A client gets its answer once the batch holding its check-in is
+written. The
+PRESENT/LATE rule and the session checks are the ones student_checkin uses.
+
+Protocol: one JSON object per line in each direction.
+    -> {"student_id": "U001", "session_id": "S001"}
+    <- {"ok": true, "message": "Checked in as Present.", "state": "Present", "record_id": "A0042"}
+
+Run the service from inside src/:
+    python -m services.checkin_server --port 8765
+"""
+import argparse
+import asyncio
+import json
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from services.attendance_service import check_session_open, checkin_state, has_checked_in, write_checkins
+from services.timetable_service import get_session_by_id, get_sessions_between
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Sessions starting this close to now are kept in memory when open; others
+# are looked up on demand
+SESSION_WINDOW = timedelta(hours=12)
+
+
+class CheckinServer:
+    """asyncio check-in server holding the hot state in memory.
+
+    Args:
+        host, port: address to listen on (localhost only by default)
+        batch_size: most check-ins written by one append
+        refresh_interval: seconds between reloads of the open sessions, so
+            sessions opened or locked elsewhere (e.g. by the session
+            scheduler) are picked up
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        batch_size: int = 500,
+        refresh_interval: float = 5.0,
+    ):
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self._sessions: Dict[str, dict] = {}
+        self._refreshed_at = 0.0
+        # Check-ins accepted but not written yet: (student_id, session_id) -> future
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._queue: List[tuple] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {"accepted": 0, "rejected": 0, "batches": 0}
+
+    def _refresh_sessions(self) -> None:
+        now = datetime.now()
+        sessions = {}
+        for row in get_sessions_between(now - SESSION_WINDOW, now + SESSION_WINDOW):
+            sess = get_session_by_id(row["id"])
+            if check_session_open(sess, row["id"]) is None:
+                sessions[row["id"]] = sess
+        self._sessions = sessions
+        self._refreshed_at = time.monotonic()
+
+    def _get_session(self, session_id: str) -> Optional[dict]:
+        if time.monotonic() - self._refreshed_at > self.refresh_interval:
+            self._refresh_sessions()
+        sess = self._sessions.get(session_id)
+        if sess is None:
+            # May have been opened since the last refresh
+            sess = get_session_by_id(session_id)
+            if sess is not None and check_session_open(sess, session_id) is None:
+                self._sessions[session_id] = sess
+        return sess
+
+    async def checkin(self, student_id: str, session_id: str) -> dict:
+        """Check a student in; resolves once the record is written."""
+        sess = self._get_session(session_id)
+        error = check_session_open(sess, session_id)
+        pair = (student_id, session_id)
+        if not error and (pair in self._pending or has_checked_in(student_id, session_id)):
+            error = "You have already checked in for this session."
+        if error:
+            self.stats["rejected"] += 1
+            return {"ok": False, "message": error}
+
+        now = datetime.now()
+        state = checkin_state(sess["start_datetime"], now)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[pair] = future
+        self._queue.append((student_id, session_id, now, state))
+        self._wakeup.set()
+
+        record_id = await future
+        if record_id is None:
+            self.stats["rejected"] += 1
+            return {"ok": False, "message": "You have already checked in for this session."}
+        self.stats["accepted"] += 1
+        return {"ok": True, "message": f"Checked in as {state.value}.", "state": state.value,
+                "record_id": record_id}
+
+    async def _flush(self) -> None:
+        batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            # File I/O off the event loop, so new requests keep being queued
+            record_ids = await loop.run_in_executor(None, write_checkins, batch)
+        except Exception as e:
+            for student_id, session_id, _time, _state in batch:
+                self._pending.pop((student_id, session_id)).set_exception(e)
+            return
+        self.stats["batches"] += 1
+        for (student_id, session_id, _time, _state), record_id in zip(batch, record_ids):
+            self._pending.pop((student_id, session_id)).set_result(record_id)
+
+    async def _flusher(self) -> None:
+        # One write at a time; check-ins queued during a write go into the next
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._flush()
+            if self._queue:
+                self._wakeup.set()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    response = await self.checkin(str(request["student_id"]), str(request["session_id"]))
+                except (ValueError, KeyError, TypeError):
+                    response = {"ok": False, "message": "Invalid request: expected student_id and session_id."}
+                except Exception as e:
+                    response = {"ok": False, "message": f"Check-in failed: {e}"}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._refresh_sessions()
+        server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        flusher = asyncio.create_task(self._flusher())
+        print(f"[OK] Check-in service listening on {self.host}:{self.port} "
+              f"({len(self._sessions)} open session(s) around now)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            while self._queue:
+                await self._flush()
+
+
+class CheckinClient:
+    """Blocking client for the check-in service (one connection, one request at a time)."""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = 30.0):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def checkin(self, student_id: str, session_id: str) -> dict:
+        self._file.write(json.dumps({"student_id": student_id, "session_id": session_id}).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Check-in service closed the connection")
+        return json.loads(line)
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the check-in service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--batch-size", type=int, default=500, help="check-ins per write at most")
+    parser.add_argument("--refresh-interval", type=float, default=5.0, help="seconds between open-session reloads")
+    args = parser.parse_args()
+
+    server = CheckinServer(args.host, args.port, args.batch_size, args.refresh_interval)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print(f"\nCheck-in service stopped ({server.stats['accepted']} check-ins, "
+              f"{server.stats['batches']} writes).")
+
+
+if __name__ == "__main__":
+    main()
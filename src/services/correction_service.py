@@ -1,70 +1,103 @@
+from dataclasses import replace
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Iterable, List, Optional
+from models.attendance import AttendanceState
 from models.correction import CorrectionRequest, CorrectionStatus
+from services.attendance_service import update_attendance_states
+from services.repository import append_lines, data_path, load_incremental, locked, next_sequence, write_lines
+
+
+# corrections.txt is append-only: a status change appends the full updated
+# line, and the last line of a request_id wins. compact() folds it back to
+# one line per request.
+def _new_request_index() -> dict:
+    return {"by_id": {}, "by_lecturer_status": {}, "lines": 0, "max_num": 0}
+
+
+def _feed_request_index(index: dict, lines) -> None:
+    """Index requests by request_id and by (lecturer_id, status)."""
+    by_id = index["by_id"]
+    by_lecturer_status = index["by_lecturer_status"]
+    for line in lines:
+        index["lines"] += 1
+        try:
+            request = CorrectionRequest.from_line(line)
+        except ValueError as e:
+            print(f"[WARNING] Skip invalid line: {e}")
+            continue
+
+        previous = by_id.get(request.request_id)
+        if previous is not None:
+            by_lecturer_status.get((previous.lecturer_id, previous.status), {}).pop(request.request_id, None)
+        else:
+            # Extract số từ request_id (CR0001 -> 1)
+            try:
+                index["max_num"] = max(index["max_num"], int(request.request_id.replace("CR", "")))
+            except ValueError:
+                pass
+        by_id[request.request_id] = request
+        by_lecturer_status.setdefault((request.lecturer_id, request.status), {})[request.request_id] = request
+
 
 class CorrectionService:
-    CORRECTIONS_FILE = Path("data/corrections.txt")
+    CORRECTIONS_FILE = "corrections.txt"
+    # Compact once superseded lines outnumber both this and the live requests
+    COMPACT_MIN_STALE = 1000
     
     def __init__(self, corrections_file: Optional[Path] = None):
-        self.file_path = corrections_file or self.CORRECTIONS_FILE
+        self.file_path = Path(corrections_file or data_path(self.CORRECTIONS_FILE)).resolve()
+        # Name of the id counter and of the lock: the data directory's file
+        # uses "corrections"; any other file gets its own, next to the file
+        if self.file_path == Path(data_path(self.CORRECTIONS_FILE)).resolve():
+            self._name = self.file_path.stem
+        else:
+            self._name = str(self.file_path.with_suffix(""))
         self._ensure_file_exists()
-        self._request_counter = self._get_last_request_number()
+        # Requests are parsed on the first query, not here
     
     def _ensure_file_exists(self):
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
         if not self.file_path.exists():
             self.file_path.touch()
     
+    def _index(self) -> dict:
+        return load_incremental(str(self.file_path), _new_request_index, _feed_request_index)
+
     def _get_last_request_number(self) -> int:
-        requests = self._read_all_requests()
-        if not requests:
-            return 0
-        
-        # Extract số từ request_id (CR0001 -> 1)
-        numbers = []
-        for req in requests:
-            try:
-                num = int(req.request_id.replace("CR", ""))
-                numbers.append(num)
-            except ValueError:
-                continue
-        
-        return max(numbers) if numbers else 0
+        return self._index()["max_num"]
     
     def _generate_request_id(self) -> str:
-        self._request_counter += 1
-        return f"CR{self._request_counter:04d}"
+        # Persisted counter; the file is only scanned for its highest id when
+        # the counter does not exist yet. Call with locked(self._name) held,
+        # together with the append.
+        number = next_sequence(self._name, floor=self._get_last_request_number)
+        return f"CR{number:04d}"
     
     def _read_all_requests(self) -> List[CorrectionRequest]:
-        requests = []
-        with open(self.file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    try:
-                        request = CorrectionRequest.from_line(line)
-                        requests.append(request)
-                    except ValueError as e:
-                        print(f"[WARNING] Skip invalid line: {e}")
-        return requests
+        return list(self._index()["by_id"].values())
     
     def _write_request(self, request: CorrectionRequest):
-        with open(self.file_path, 'a', encoding='utf-8') as f:
-            f.write(request.to_line() + '\n')
+        append_lines(str(self.file_path), [request.to_line()])
     
-    def _update_request_in_file(self, request: CorrectionRequest):
-        all_requests = self._read_all_requests()
-        
-        # Update request
-        for i, req in enumerate(all_requests):
-            if req.request_id == request.request_id:
-                all_requests[i] = request
-                break
-        
-        # Ghi lại toàn bộ file
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            for req in all_requests:
-                f.write(req.to_line() + '\n')
+    def _update_requests_in_file(self, requests: List[CorrectionRequest]):
+        # Ghi thêm dòng mới (dòng cuối cùng của request_id được dùng).
+        # Gọi khi đang giữ locked(self._name).
+        append_lines(str(self.file_path), [req.to_line() for req in requests])
+
+    def _compact_if_stale(self) -> None:
+        index = self._index()
+        if index["lines"] - len(index["by_id"]) > max(self.COMPACT_MIN_STALE, len(index["by_id"])):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite corrections.txt with only the latest line of each request."""
+        # The lock keeps appends out between reading the requests and the rewrite
+        with locked(self._name):
+            requests = self._read_all_requests()
+            write_lines(str(self.file_path), (req.to_line() for req in requests))
+
+    def get_request(self, request_id: str) -> Optional[CorrectionRequest]:
+        return self._index()["by_id"].get(request_id)
     
     def request_correction(
         self, 
@@ -78,69 +111,111 @@ class CorrectionService:
             print("[ERROR] Reason cannot be empty")
             return False
         
-        new_request = CorrectionRequest(
-            request_id=self._generate_request_id(),
-            student_id=student_id,
-            session_id=session_id,
-            record_id=record_id,
-            reason=reason.strip(),
-            status=CorrectionStatus.PENDING,
-            lecturer_id=lecturer_id
-        )
+        # Allocate the id and append under one lock, so two processes never
+        # write the same id (the later line would replace the earlier request)
+        with locked(self._name):
+            new_request = CorrectionRequest(
+                request_id=self._generate_request_id(),
+                student_id=student_id,
+                session_id=session_id,
+                record_id=record_id,
+                reason=reason.strip(),
+                status=CorrectionStatus.PENDING,
+                lecturer_id=lecturer_id
+            )
+            self._write_request(new_request)
         
-        self._write_request(new_request)
         print(f"[OK] Request recorded – Status: {new_request.status.value}")
         print(f"     Request ID: {new_request.request_id}")
         return True
     
-    def list_pending_requests(self, lecturer_id: str) -> List[CorrectionRequest]:
-        all_requests = self._read_all_requests()
+    def list_pending_requests(
+        self,
+        lecturer_id: str,
+        session_id: Optional[str] = None,
+        student_id: Optional[str] = None
+    ) -> List[CorrectionRequest]:
+        bucket = self._index()["by_lecturer_status"].get((lecturer_id, CorrectionStatus.PENDING), {})
         return [
-            req for req in all_requests
-            if req.lecturer_id == lecturer_id and req.status == CorrectionStatus.PENDING
+            req for req in bucket.values()
+            if (session_id is None or req.session_id == session_id)
+            and (student_id is None or req.student_id == student_id)
         ]
     
+    def _change_statuses(
+        self, request_ids: Iterable[str], status: CorrectionStatus, note: str,
+        before_append: Optional[Callable[[List[CorrectionRequest]], None]] = None
+    ) -> List[CorrectionRequest]:
+        """Move pending requests to ``status`` with one index read and one append.
+
+        ``before_append`` receives the changed requests and runs under the
+        same lock, before their status lines are written. If it raises,
+        nothing is changed and the requests stay pending.
+        """
+        note = note.strip() if note else None
+        changed = {}
+        # Read and append under the lock, so a request is never changed twice
+        # and no concurrent append is lost to a compaction
+        with locked(self._name):
+            by_id = self._index()["by_id"]
+            for request_id in request_ids:
+                request = by_id.get(request_id)
+                if request is None or request.status != CorrectionStatus.PENDING or request_id in changed:
+                    print(f"[ERROR] Request {request_id} not found or not pending")
+                    continue
+                # Cached requests are shared: write an updated copy
+                changed[request_id] = replace(request, status=status, note=note)
+
+            if changed:
+                try:
+                    if before_append is not None:
+                        before_append(list(changed.values()))
+                    self._update_requests_in_file(list(changed.values()))
+                except Exception as e:
+                    print(f"[ERROR] Failed to update requests: {e}")
+                    return []
+        if changed:
+            self._compact_if_stale()
+        return list(changed.values())
+    
+    def _apply_approvals(self, requests: List[CorrectionRequest]) -> None:
+        """Mark the attendance records of approved requests as PRESENT."""
+        if not requests:
+            return
+        update_attendance_states(
+            (req.record_id, AttendanceState.PRESENT, f"Correction {req.request_id} approved") for req in requests
+        )
+        if len(requests) == 1:
+            print(f"[OK] Updated attendance record {requests[0].record_id} to PRESENT")
+        else:
+            print(f"[OK] Updated {len(requests)} attendance records to PRESENT")
+    
+    def approve_requests(self, request_ids: Iterable[str], note: str = "") -> List[str]:
+        """Approve several pending requests at once; returns the approved ids."""
+        # The attendance overrides are written before the status lines, so a
+        # failed write leaves the requests pending and they can be approved again
+        approved = self._change_statuses(request_ids, CorrectionStatus.APPROVED, note, self._apply_approvals)
+        if approved:
+            print(f"[OK] {len(approved)} request(s) approved")
+        return [req.request_id for req in approved]
+    
+    def reject_requests(self, request_ids: Iterable[str], note: str = "") -> List[str]:
+        """Reject several pending requests at once; returns the rejected ids."""
+        rejected = self._change_statuses(request_ids, CorrectionStatus.REJECTED, note)
+        if rejected:
+            print(f"[OK] {len(rejected)} request(s) rejected")
+        return [req.request_id for req in rejected]
+    
     def approve_request(self, request_id: str, note: str = "") -> bool:
-        all_requests = self._read_all_requests()
-        
-        # Tìm request
-        request = None
-        for req in all_requests:
-            if req.request_id == request_id and req.status == CorrectionStatus.PENDING:
-                request = req
-                break
-        
-        if not request:
-            print(f"[ERROR] Request {request_id} not found or not pending")
+        if not self._change_statuses([request_id], CorrectionStatus.APPROVED, note, self._apply_approvals):
             return False
         
-        # Update status
-        request.status = CorrectionStatus.APPROVED
-        request.note = note.strip() if note else None
-        self._update_request_in_file(request)
-        print(f"[MOCK] Updated attendance record {request.record_id} to PRESENT")
-        
         print(f"[OK] Request #{request_id} approved")
         return True
     
     def reject_request(self, request_id: str, note: str = "") -> bool:
-        all_requests = self._read_all_requests()
-        
-        # Tìm request
-        request = None
-        for req in all_requests:
-            if req.request_id == request_id and req.status == CorrectionStatus.PENDING:
-                request = req
-                break
-        
-        if not request:
-            print(f"[ERROR] Request {request_id} not found or not pending")
+        if not self._change_statuses([request_id], CorrectionStatus.REJECTED, note):
             return False
         
-        # Update status
-        request.status = CorrectionStatus.REJECTED
-        request.note = note.strip() if note else None
-        self._update_request_in_file(request)
-        
         print(f"[OK] Request #{request_id} rejected")
-        return True
\ No newline at end of file
+        return True
@@ -0,0 +1,78 @@
+"""Salted password hashes for users.txt.
+
+A hash is stored in the password field of users.txt as
+
+    scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>
+
+or, where hashlib was built without scrypt, as
+
+    pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>
+
+Neither form contains a comma, so the line format does not change. A password
+field without one of these prefixes is a legacy plaintext password; it is
+still accepted until auth_service.hash_stored_passwords() replaces it.
+
+The cost is tunable with the SAS_SCRYPT_N (a power of two) and
+SAS_PBKDF2_ITERATIONS environment variables. The parameters are stored with
+every hash, so changing the cost does not invalidate existing hashes.
+Size the cost with python -m benchmarks.bench_passwords.
+"""
+import hashlib
+import hmac
+import os
+from typing import Optional
+
+SCRYPT_N = int(os.environ.get("SAS_SCRYPT_N", 2 ** 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("SAS_PBKDF2_ITERATIONS", 200_000))
+SALT_BYTES = 16
+
+HAS_SCRYPT = hasattr(hashlib, "scrypt")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # 128 * n * r bytes of memory, plus headroom for OpenSSL
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + (1 << 20), dklen=32)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def hash_password(password: str, cost: Optional[int] = None) -> str:
+    """Return a new salted hash of ``password`` in users.txt format.
+
+    ``cost`` overrides the scrypt N (or the PBKDF2 iteration count when
+    scrypt is not available).
+    """
+    salt = os.urandom(SALT_BYTES)
+    if HAS_SCRYPT:
+        n = cost or SCRYPT_N
+        digest = _scrypt(password, salt, n, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+    iterations = cost or PBKDF2_ITERATIONS
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${_pbkdf2(password, salt, iterations).hex()}"
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(("scrypt$", "pbkdf2_sha256$"))
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check ``password`` against a stored hash or legacy plaintext password."""
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            digest = _scrypt(password, bytes.fromhex(parts[4]), n, r, p)
+            return hmac.compare_digest(digest.hex(), parts[5])
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            digest = _pbkdf2(password, bytes.fromhex(parts[2]), int(parts[1]))
+            return hmac.compare_digest(digest.hex(), parts[3])
+    except (ValueError, MemoryError) as e:
+        print(f"[ERROR] Unreadable password hash: {e}")
+        return False
+    return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
@@ -2,38 +2,15 @@ import os
 from datetime import datetime
 from typing import List, Dict, Optional
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-from models.attendance import AttendanceRecord, AttendanceState
-from services.timetable_service import load_sessions, load_classes, load_courses
-
-
-
-def _data_path(filename: str) -> str:
-    """Get absolute path to data file."""
-    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
-    return os.path.join(root, filename)
-
-
-def _load_all_attendance_records() -> List[AttendanceRecord]:
-    """Load all attendance records from attendance.txt."""
-    records = []
-    path = _data_path("attendance.txt")
-
-    if not os.path.exists(path):
-        return records
-
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                record = AttendanceRecord.from_line(line)
-                records.append(record)
-            except Exception:
-                continue
-
-    return records
+from models.attendance import AttendanceState
+from services.attendance_service import iter_attendance_records
+from services.timetable_service import (
+    load_sessions, load_classes, load_courses, load_enrollments,
+    get_class_by_id, get_class_sessions, get_class_students, get_course_by_id, get_student_classes
+)
+from services.user_directory import get_user, get_user_names
 
 
 def _get_students_in_class(class_id: str) -> List[tuple]:
@@ -41,109 +18,81 @@ def _get_students_in_class(class_id: str) -> List[tuple]:
 
     Returns: list of (student_id, student_name) tuples
     """
-    cs_path = _data_path("class_student.txt")
-    users_path = _data_path("users.txt")
+    id_name = get_user_names()
 
-    student_ids = []
-    try:
-        with open(cs_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                parts = line.split(",")
-                if len(parts) >= 2 and parts[0].strip() == class_id:
-                    student_ids.append(parts[1].strip())
-    except FileNotFoundError:
-        return []
-
-    # Build id->name map
-    id_name = {}
-    try:
-        with open(users_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                parts = line.split(",")
-                if len(parts) >= 2:
-                    id_name[parts[0].strip()] = parts[1].strip()
-    except FileNotFoundError:
-        pass
+    return [(sid, id_name.get(sid, "Unknown")) for sid in get_class_students(class_id)]
 
-    return [(sid, id_name.get(sid, "Unknown")) for sid in student_ids]
 
+# Tally slot for each state: tallies are [present, late, absent] lists.
+_STATE_SLOT = {
+    AttendanceState.PRESENT: 0,
+    AttendanceState.LATE: 1,
+    AttendanceState.ABSENT: 2,
+}
 
-def generate_report_by_class(class_id: str) -> Dict:
-    """Generate attendance report for a specific class.
 
-    Returns a dict with:
-    - class_info: dict with class details
-    - sessions: list of session dicts for this class
-    - student_stats: list of dicts with student attendance statistics
-    - summary: overall class statistics
+def _aggregate_attendance(records, session_class: Dict[str, str]) -> Dict[tuple, List[int]]:
+    """Tally attendance records by (class_id, student_id) in one pass.
+
+    Args:
+        records: iterable of AttendanceRecord
+        session_class: session_id -> class_id for the sessions to count;
+            records of any other session are ignored
+
+    Returns: dict mapping (class_id, student_id) to [present, late, absent]
     """
-    # Load class info
-    classes = load_classes()
-    class_info = next((c for c in classes if c["id"] == class_id), None)
+    tallies: Dict[tuple, List[int]] = {}
+    class_of = session_class.get
+    for r in records:
+        class_id = class_of(r.session_id)
+        if class_id is None:
+            continue
+        key = (class_id, r.student_id)
+        tally = tallies.get(key)
+        if tally is None:
+            tally = tallies[key] = [0, 0, 0]
+        tally[_STATE_SLOT[r.state]] += 1
+    return tallies
 
-    if not class_info:
-        return {
-            "error": f"Class {class_id} not found",
-            "class_info": None,
-            "sessions": [],
-            "student_stats": [],
-            "summary": {}
-        }
 
-    # Load course info
-    courses = load_courses()
-    course = next((c for c in courses if c["id"] == class_info["course_id"]), None)
-    course_name = course["name"] if course else "Unknown"
+def _attendance_stats(total_sessions: int, tally: Optional[List[int]]) -> Dict:
+    """Turn a [present, late, absent] tally into report counters.
 
-    # Get all sessions for this class
-    all_sessions = load_sessions()
-    class_sessions = [s for s in all_sessions if s["class_id"] == class_id]
+    Sessions without any record count as absent.
+    """
+    present_count, late_count, explicit_absent = tally or (0, 0, 0)
+    attended_sessions = present_count + late_count + explicit_absent
+    absent_count = total_sessions - attended_sessions + explicit_absent
 
-    # Get all students in this class
-    students = _get_students_in_class(class_id)
+    # Calculate attendance percentage
+    attendance_pct = 0.0
+    if total_sessions > 0:
+        attendance_pct = ((present_count + late_count) / total_sessions) * 100
 
-    # Load all attendance records
-    all_records = _load_all_attendance_records()
+    return {
+        "total_sessions": total_sessions,
+        "present": present_count,
+        "late": late_count,
+        "absent": absent_count,
+        "attendance_pct": round(attendance_pct, 2)
+    }
 
-    # Get session IDs for this class
-    session_ids = [s["id"] for s in class_sessions]
 
-    # Filter attendance records for this class's sessions
-    class_records = [r for r in all_records if r.session_id in session_ids]
+def _class_report(class_info: Dict, course_name: str, class_sessions: List[Dict],
+                  students: List[tuple], tallies: Dict[tuple, List[int]]) -> Dict:
+    """Assemble the report dict of one class from pre-computed tallies."""
+    class_id = class_info["id"]
 
     # Build student statistics
+    total_sessions = len(class_sessions)
     student_stats = []
 
     for student_id, student_name in students:
-        # Get this student's records for this class
-        student_records = [r for r in class_records if r.student_id == student_id]
-
-        total_sessions = len(class_sessions)
-        attended_sessions = len(student_records)
-
-        present_count = sum(1 for r in student_records if r.state == AttendanceState.PRESENT)
-        late_count = sum(1 for r in student_records if r.state == AttendanceState.LATE)
-        absent_count = total_sessions - attended_sessions + sum(1 for r in student_records if r.state == AttendanceState.ABSENT)
-
-        # Calculate attendance percentage
-        attendance_pct = 0.0
-        if total_sessions > 0:
-            attendance_pct = ((present_count + late_count) / total_sessions) * 100
-
+        stats = _attendance_stats(total_sessions, tallies.get((class_id, student_id)))
         student_stats.append({
             "student_id": student_id,
             "student_name": student_name,
-            "total_sessions": total_sessions,
-            "present": present_count,
-            "late": late_count,
-            "absent": absent_count,
-            "attendance_pct": round(attendance_pct, 2)
+            **stats
         })
 
     # Calculate overall summary
@@ -154,7 +103,7 @@ def generate_report_by_class(class_id: str) -> Dict:
 
     summary = {
         "total_students": total_students,
-        "total_sessions": len(class_sessions),
+        "total_sessions": total_sessions,
         "average_attendance_pct": round(avg_attendance, 2)
     }
 
@@ -173,76 +122,19 @@ def generate_report_by_class(class_id: str) -> Dict:
     }
 
 
-def generate_report_by_student(student_id: str) -> Dict:
-    """Generate attendance report for a specific student across all classes.
-
-    Returns a dict with:
-    - student_info: dict with student details
-    - class_stats: list of dicts with attendance per class
-    - overall_summary: overall statistics across all classes
-    """
-    # Load student info
-    users_path = _data_path("users.txt")
-    student_name = "Unknown"
-
-    try:
-        with open(users_path, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split(",")
-                if len(parts) >= 2 and parts[0].strip() == student_id:
-                    student_name = parts[1].strip()
-                    break
-    except FileNotFoundError:
-        pass
-
-    # Find all classes this student is enrolled in
-    cs_path = _data_path("class_student.txt")
-    student_classes = []
-
-    try:
-        with open(cs_path, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split(",")
-                if len(parts) >= 2 and parts[1].strip() == student_id:
-                    student_classes.append(parts[0].strip())
-    except FileNotFoundError:
-        pass
-
-    # Load all attendance records for this student
-    all_records = _load_all_attendance_records()
-    student_records = [r for r in all_records if r.student_id == student_id]
-
-    # Load class and course info
-    classes = load_classes()
-    courses = load_courses()
-    all_sessions = load_sessions()
-
-    course_map = {c["id"]: c["name"] for c in courses}
-
+def _student_report(student_id: str, student_name: str, student_classes: List[str],
+                    class_map: Dict[str, Dict], course_map: Dict[str, str],
+                    sessions_per_class: Dict[str, int], tallies: Dict[tuple, List[int]]) -> Dict:
+    """Assemble the report dict of one student from pre-computed tallies."""
     # Build stats per class
     class_stats = []
 
     for class_id in student_classes:
-        class_info = next((c for c in classes if c["id"] == class_id), None)
+        class_info = class_map.get(class_id)
         if not class_info:
             continue
 
-        # Get sessions for this class
-        class_sessions = [s for s in all_sessions if s["class_id"] == class_id]
-        session_ids = [s["id"] for s in class_sessions]
-
-        # Get records for this class
-        class_records = [r for r in student_records if r.session_id in session_ids]
-
-        total_sessions = len(class_sessions)
-        present_count = sum(1 for r in class_records if r.state == AttendanceState.PRESENT)
-        late_count = sum(1 for r in class_records if r.state == AttendanceState.LATE)
-        absent_count = total_sessions - len(class_records) + sum(1 for r in class_records if r.state == AttendanceState.ABSENT)
-
-        attendance_pct = 0.0
-        if total_sessions > 0:
-            attendance_pct = ((present_count + late_count) / total_sessions) * 100
-
+        stats = _attendance_stats(sessions_per_class.get(class_id, 0), tallies.get((class_id, student_id)))
         course_name = course_map.get(class_info["course_id"], "Unknown")
 
         class_stats.append({
@@ -250,11 +142,7 @@ def generate_report_by_student(student_id: str) -> Dict:
             "class_name": class_info["name"],
             "course_name": course_name,
             "semester": class_info["semester"],
-            "total_sessions": total_sessions,
-            "present": present_count,
-            "late": late_count,
-            "absent": absent_count,
-            "attendance_pct": round(attendance_pct, 2)
+            **stats
         })
 
     # Calculate overall summary
@@ -287,6 +175,176 @@ def generate_report_by_student(student_id: str) -> Dict:
     }
 
 
+def generate_report_by_class(class_id: str) -> Dict:
+    """Generate attendance report for a specific class.
+
+    Returns a dict with:
+    - class_info: dict with class details
+    - sessions: list of session dicts for this class
+    - student_stats: list of dicts with student attendance statistics
+    - summary: overall class statistics
+    """
+    # Load class info
+    class_info = get_class_by_id(class_id)
+
+    if not class_info:
+        return {
+            "error": f"Class {class_id} not found",
+            "class_info": None,
+            "sessions": [],
+            "student_stats": [],
+            "summary": {}
+        }
+
+    # Load course info
+    course = get_course_by_id(class_info["course_id"])
+    course_name = course["name"] if course else "Unknown"
+
+    # Get all sessions for this class from the per-class session index
+    class_sessions = get_class_sessions(class_id)
+
+    # Get all students in this class
+    students = _get_students_in_class(class_id)
+
+    # Tally this class's records per student in a single pass
+    session_class = {s["id"]: class_id for s in class_sessions}
+    tallies = _aggregate_attendance(iter_attendance_records(session_ids=session_class.keys()), session_class)
+
+    return _class_report(class_info, course_name, class_sessions, students, tallies)
+
+
+def generate_report_by_student(student_id: str) -> Dict:
+    """Generate attendance report for a specific student across all classes.
+
+    Returns a dict with:
+    - student_info: dict with student details
+    - class_stats: list of dicts with attendance per class
+    - overall_summary: overall statistics across all classes
+    """
+    # Load student info
+    student = get_user(student_id)
+    student_name = student.name if student else "Unknown"
+
+    # Find all classes this student is enrolled in
+    student_classes = get_student_classes(student_id)
+
+    # Look up only this student's classes and their courses
+    class_map = {cid: c for cid in student_classes if (c := get_class_by_id(cid)) is not None}
+    course_map = {}
+    for c in class_map.values():
+        course = get_course_by_id(c["course_id"])
+        if course is not None:
+            course_map[course["id"]] = course["name"]
+
+    # Map this student's class sessions to their class, then tally in one pass
+    sessions_per_class: Dict[str, int] = defaultdict(int)
+    session_class: Dict[str, str] = {}
+    for cid in set(student_classes):
+        for s in get_class_sessions(cid):
+            sessions_per_class[cid] += 1
+            session_class[s["id"]] = cid
+
+    student_records = iter_attendance_records(student_id=student_id, session_ids=session_class.keys())
+    tallies = _aggregate_attendance(student_records, session_class)
+
+    return _student_report(student_id, student_name, student_classes,
+                           class_map, course_map, sessions_per_class, tallies)
+
+
+def generate_all_reports() -> Dict:
+    """Generate every class report and every student report in one pass.
+
+    Classes, sessions, enrollments and attendance records are read once and
+    all records are tallied together, instead of once per report.
+
+    Returns a dict with:
+    - classes: class_id -> report dict (as generate_report_by_class)
+    - students: student_id -> report dict (as generate_report_by_student),
+      for every student enrolled in at least one class
+    """
+    classes = load_classes()
+    class_map = {c["id"]: c for c in classes}
+    course_map = {c["id"]: c["name"] for c in load_courses()}
+    id_name = get_user_names()
+
+    # Group sessions and enrollments by class once
+    sessions_by_class: Dict[str, List[Dict]] = defaultdict(list)
+    session_class: Dict[str, str] = {}
+    for s in load_sessions():
+        sessions_by_class[s["class_id"]].append(s)
+        session_class[s["id"]] = s["class_id"]
+    sessions_per_class = {cid: len(sess) for cid, sess in sessions_by_class.items()}
+
+    students_by_class: Dict[str, List[str]] = defaultdict(list)
+    classes_by_student: Dict[str, List[str]] = defaultdict(list)
+    for cid, sid in load_enrollments():
+        students_by_class[cid].append(sid)
+        classes_by_student[sid].append(cid)
+
+    tallies = _aggregate_attendance(iter_attendance_records(), session_class)
+
+    class_reports = {}
+    for class_info in classes:
+        cid = class_info["id"]
+        course_name = course_map.get(class_info["course_id"], "Unknown")
+        students = [(sid, id_name.get(sid, "Unknown")) for sid in students_by_class.get(cid, [])]
+        class_reports[cid] = _class_report(class_info, course_name, sessions_by_class.get(cid, []),
+                                           students, tallies)
+
+    student_reports = {}
+    for sid, student_classes in classes_by_student.items():
+        student_reports[sid] = _student_report(sid, id_name.get(sid, "Unknown"), student_classes,
+                                               class_map, course_map, sessions_per_class, tallies)
+
+    return {"classes": class_reports, "students": student_reports}
+
+
+def _export_job(job: tuple) -> bool:
+    """Worker entry point: export one (report, path, report_type) job."""
+    report_data, output_path, report_type = job
+    return export_report_to_file(report_data, output_path, report_type)
+
+
+def export_all_reports(output_dir: str, workers: Optional[int] = None) -> Dict:
+    """Generate all reports in one pass and export each one to ``output_dir``.
+
+    Files are named class_<class_id>.txt and student_<student_id>.txt.
+    Formatting and writing are spread over a process pool. The reports are
+    built once in this process, so workers never reload the data files.
+
+    Args:
+        output_dir: Directory to write the report files into
+        workers: Number of worker processes (default: CPU count);
+            1 exports sequentially in this process
+
+    Returns a dict with the number of files written and the names that failed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    reports = generate_all_reports()
+
+    jobs = []
+    filenames = []
+    for report_type, key in (("class", "classes"), ("student", "students")):
+        for report_id, report in reports[key].items():
+            filename = f"{report_type}_{report_id}.txt"
+            if report_type == "class":
+                # the session list is not exported, keep it out of the pickles
+                report = {k: v for k, v in report.items() if k != "sessions"}
+            jobs.append((report, os.path.join(output_dir, filename), report_type))
+            filenames.append(filename)
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        results = [_export_job(job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_export_job, jobs, chunksize=chunksize))
+
+    failed = [name for name, ok in zip(filenames, results) if not ok]
+    return {"written": len(results) - len(failed), "failed": failed}
+
+
 def export_report_to_file(report_data: Dict, output_path: str, report_type: str = "class") -> bool:
     """Export report data to a text file.
 
@@ -0,0 +1,246 @@
+"""Shared access layer for the data files under ``data/``.
+
+Services read their files through :func:`load_incremental`, which parses a
+file once, keeps the parsed value in memory and then feeds only the lines
+appended since the previous call into it; a rewrite of the file rebuilds it.
+Files read once per request are streamed with :func:`iter_lines` or
+:func:`select_lines` instead.
+Writes go through :func:`append_lines` / :func:`write_lines`; every write
+changes the file's stamp, and rewrites also drop the cached values at once.
+
+The files are stored by the backend selected with ``SAS_STORAGE`` (plain
+text by default, or SQLite; see :mod:`services.storage`). Services only
+ever see lines, so they run unchanged on either backend.
+
+Cached values are shared between callers and must be treated as read-only.
+
+Record files edited by the admin (users, courses, classes) are append-only
+as well: the last line of an id wins and a tombstone line ``<id>,#deleted``
+removes the record, until :func:`compact_records` rewrites the file.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional, TypeVar, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: locked() falls back to an in-process lock
+    fcntl = None
+
+try:
+    from src.services.storage import STALE, from_environment
+except Exception:
+    from services.storage import STALE, from_environment
+
+T = TypeVar("T")
+
+_DEFAULT_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+
+_data_dir = os.path.abspath(os.environ.get("SAS_DATA_DIR") or _DEFAULT_DATA_DIR)
+_storage = from_environment(_data_dir)
+
+# (absolute path, feed) -> _Tail of an incremental load
+_cache: dict = {}
+_lock = threading.RLock()
+
+# name -> threading.Lock backing locked(name) inside this process
+_named_locks: dict = {}
+
+TOMBSTONE = "#deleted"
+
+
+def get_data_dir() -> str:
+    """Return the directory that holds the data files."""
+    return _data_dir
+
+
+def set_data_dir(path: str) -> None:
+    """Point the repository at another data directory and drop the cache.
+
+    The backend is rebuilt from the environment for the new directory.
+    """
+    global _data_dir, _storage
+    with _lock:
+        _data_dir = os.path.abspath(path)
+        _storage = from_environment(_data_dir)
+        _cache.clear()
+
+
+def get_storage():
+    """Return the active storage backend."""
+    return _storage
+
+
+def set_storage(storage) -> None:
+    """Use another storage backend (a TextStorage or SQLiteStorage) and drop the cache."""
+    global _storage
+    with _lock:
+        _storage = storage
+        _cache.clear()
+
+
+def data_path(filename: str) -> str:
+    """Get absolute path to data file."""
+    return os.path.join(_data_dir, filename)
+
+
+def iter_lines(filename: str) -> Iterator[str]:
+    """Stream the stripped, non-empty lines of a data file without caching."""
+    return _storage.iter_lines(filename)
+
+
+def select_lines(filename: str, column: str, values: Iterable[str]) -> Iterator[str]:
+    """Stream the lines whose key ``column`` is one of ``values``, without caching.
+
+    ``column`` is one of the key columns listed in ``storage.SCHEMAS`` for the
+    file. The SQLite backend answers from an index; the text backend scans.
+    """
+    return _storage.select_lines(filename, column, set(values))
+
+
+def select_is_indexed() -> bool:
+    """True if :func:`select_lines` answers from an index instead of scanning the file."""
+    return _storage.indexed
+
+
+class _Tail:
+    """Cached value of an incremental load and the backend's read cursor."""
+
+    __slots__ = ("stamp", "value", "cursor")
+
+    def __init__(self, stamp, value, cursor):
+        self.stamp = stamp
+        self.value = value
+        self.cursor = cursor
+
+
+def load_incremental(filename: str, create: Callable[[], T], feed: Callable[[T, Iterable[str]], None]) -> T:
+    """Return a value built from an append-only data file, feeding only new lines.
+
+    Args:
+        filename: File name inside the data directory (or an absolute path)
+        create: Callable returning a new, empty value
+        feed: Callable adding stripped, non-empty lines to a value in place
+
+    When the file only grew since the last call, just the appended lines are
+    fed into the cached value. Any other change (rewrite, truncation,
+    replacement) rebuilds the value from scratch.
+    """
+    key = (data_path(filename), feed)
+    storage = _storage
+
+    with _lock:
+        stamp = storage.stamp(filename)
+        entry = _cache.get(key)
+        if entry is not None and entry.stamp == stamp:
+            return entry.value
+
+        if entry is not None and entry.cursor is not None:
+            value = entry.value
+            cursor = storage.read_since(filename, entry.cursor, lambda lines: feed(value, lines))
+            if cursor is not STALE:
+                entry.stamp, entry.cursor = stamp, cursor
+                return value
+
+        value = create()
+        cursor = storage.read_since(filename, None, lambda lines: feed(value, lines))
+        _cache[key] = _Tail(stamp, value, cursor)
+        return value
+
+
+def invalidate(filename: Optional[str] = None) -> None:
+    """Drop cached values for one file, or for every file if None."""
+    with _lock:
+        if filename is None:
+            _cache.clear()
+            return
+        path = data_path(filename)
+        for key in [k for k in _cache if k[0] == path]:
+            del _cache[key]
+
+
+def append_lines(filename: str, lines: Iterable[str], sync: bool = False) -> None:
+    """Append lines to a data file; ``sync`` waits until they are on disk (fsync)."""
+    _storage.append_lines(filename, lines, sync)
+
+
+@contextmanager
+def locked(name: str) -> Iterator[None]:
+    """Hold an exclusive lock shared by every thread and process using the data directory.
+
+    The lock is an advisory ``fcntl.flock`` on ``<name>.lock`` in the data
+    directory. Where fcntl is not available (Windows) it only excludes the
+    threads of this process. The lock is not reentrant.
+    """
+    with _lock:
+        thread_lock = _named_locks.setdefault(name, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        path = data_path(f"{name}.lock")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def next_sequence(name: str, floor: Union[int, Callable[[], int]] = 0, count: int = 1) -> int:
+    """Allocate ``count`` consecutive numbers from a persisted counter.
+
+    The counter lives in ``<name>.seq`` next to the data files (or in the
+    database with the SQLite backend). ``floor`` is the highest number the
+    caller already knows to be in use, so a counter that is missing or behind
+    the data never hands out a used number. A callable ``floor`` is only
+    called when the counter does not exist yet, for callers that would have
+    to scan their data to compute it.
+
+    Returns the first allocated number.
+    """
+    with _lock:
+        return _storage.next_sequence(name, floor, count)
+
+
+def write_lines(filename: str, lines: Iterable[str]) -> None:
+    """Replace the content of a data file atomically."""
+    _storage.write_lines(filename, lines)
+    invalidate(filename)
+
+
+def tombstone_line(record_id: str) -> str:
+    """Return the line that deletes ``record_id`` from a record file."""
+    return f"{record_id},{TOMBSTONE}"
+
+
+def is_tombstone(parts: list) -> bool:
+    """True if the stripped fields of a line are a tombstone."""
+    return len(parts) == 2 and parts[1] == TOMBSTONE
+
+
+def compact_records(filename: str, min_fields: int) -> int:
+    """Rewrite a record file with only the live line of each id.
+
+    Superseded lines, tombstones and the records they delete, and lines with
+    fewer than ``min_fields`` fields are dropped; records keep the position
+    of their first line, as the readers see them. Hold ``locked()`` on the
+    file's name around the call, so no append is lost between the read and
+    the rewrite.
+
+    Returns the number of lines removed.
+    """
+    latest = {}
+    total = 0
+    for line in _storage.iter_lines(filename):
+        total += 1
+        parts = [p.strip() for p in line.split(",")]
+        if is_tombstone(parts):
+            latest.pop(parts[0], None)
+        elif len(parts) >= min_fields:
+            latest[parts[0]] = line
+    if len(latest) < total:
+        write_lines(filename, latest.values())
+    return total - len(latest)
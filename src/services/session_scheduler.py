@@ -0,0 +1,161 @@
+"""Automatic opening and locking of sessions around their start time.
+
+A session is opened ``open_before`` before it starts and locked again
+``lock_after`` after it starts. Upcoming transitions are kept in a heap
+ordered by time, built from the date-sorted session index, so each tick only
+looks at the transitions that are due. Due transitions are written together
+as one append to session_status.txt (see timetable_service.set_session_statuses).
+
+Run the scheduler from inside src/:
+    python -m services.session_scheduler --open-before 15 --lock-after 60
+"""
+import argparse
+import heapq
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from models.academic import SessionStatus
+from services.timetable_service import (
+    get_session_by_id, get_sessions_between, load_sessions, set_session_statuses
+)
+
+DEFAULT_OPEN_BEFORE = timedelta(minutes=15)
+DEFAULT_LOCK_AFTER = timedelta(minutes=60)
+
+
+class SessionScheduler:
+    """Moves sessions between SessionStatus.OPEN and SessionStatus.LOCKED on time.
+
+    Args:
+        open_before: how long before the start a session opens
+        lock_after: how long after the start a session locks again
+        horizon: how far ahead transitions are loaded into the heap; the heap
+            is reloaded when half of it has elapsed, and on the next tick
+            after sessions.txt gains sessions or is rewritten
+        catch_up: on the first tick, sessions that started up to this long
+            before the lock window are brought to their expected status
+            (e.g. left open while the scheduler was not running)
+    """
+
+    def __init__(
+        self,
+        open_before: timedelta = DEFAULT_OPEN_BEFORE,
+        lock_after: timedelta = DEFAULT_LOCK_AFTER,
+        horizon: timedelta = timedelta(hours=12),
+        catch_up: timedelta = timedelta(days=1),
+    ):
+        self.open_before = open_before
+        self.lock_after = lock_after
+        self.horizon = horizon
+        self.catch_up = catch_up
+        self._heap: List[tuple] = []
+        self._loaded_until: Optional[datetime] = None
+        # The session rows list the heap was built from and its length then
+        self._rows: Optional[list] = None
+        self._row_count = 0
+        # Transitions at or before this time were already handled
+        self._done_until: Optional[datetime] = None
+
+    def _load(self, now: datetime) -> None:
+        """Rebuild the heap with the transitions due up to now + horizon."""
+        if self._done_until is None:
+            since = now - self.lock_after - self.catch_up
+        else:
+            since = self._done_until
+        until = now + self.horizon
+
+        rows = load_sessions()
+        heap = []
+        # Sessions whose open or lock time falls in (since, until]
+        for row in get_sessions_between(since - self.lock_after, until + self.open_before):
+            sess = get_session_by_id(row["id"])
+            if sess is None:
+                continue
+            start = sess["start_datetime"]
+            for when, status in ((start - self.open_before, SessionStatus.OPEN),
+                                 (start + self.lock_after, SessionStatus.LOCKED)):
+                if self._done_until is not None and when <= self._done_until:
+                    continue
+                if when <= until:
+                    heap.append((when, sess["id"], status.value))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._loaded_until = until
+        self._rows, self._row_count = rows, len(rows)
+
+    def _sessions_changed(self) -> bool:
+        """True if sessions.txt gained sessions or was rewritten since the last load."""
+        # Appends extend the cached rows list in place; a rewrite replaces it
+        rows = load_sessions()
+        return rows is not self._rows or len(rows) != self._row_count
+
+    def run_pending(self, now: Optional[datetime] = None) -> List[tuple]:
+        """Apply every transition due at ``now`` (default: the current time).
+
+        Returns the (session_id, SessionStatus) changes that were written.
+        """
+        now = now or datetime.now()
+        if (self._loaded_until is None or now >= self._loaded_until - self.horizon / 2
+                or self._sessions_changed()):
+            self._load(now)
+
+        # Pop due transitions in time order; the last one of a session wins
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            _when, session_id, status = heapq.heappop(self._heap)
+            due[session_id] = SessionStatus(status)
+        self._done_until = now
+
+        changes = []
+        for session_id, status in due.items():
+            sess = get_session_by_id(session_id)
+            if sess is not None and sess.get("status", "").lower() != status.value.lower():
+                changes.append((session_id, status))
+        if changes:
+            set_session_statuses(changes)
+        return changes
+
+    def seconds_until_next(self, now: Optional[datetime] = None) -> float:
+        """Seconds until the next transition or heap reload."""
+        now = now or datetime.now()
+        wake = self._loaded_until - self.horizon / 2 if self._loaded_until else now
+        if self._heap:
+            wake = min(wake, self._heap[0][0])
+        return max(0.0, (wake - now).total_seconds())
+
+    def run_forever(self, poll_interval: float = 30.0) -> None:
+        """Tick until interrupted, sleeping until the next transition (at most poll_interval)."""
+        while True:
+            for session_id, status in self.run_pending():
+                print(f"[OK] {datetime.now():%Y-%m-%d %H:%M:%S} Session {session_id} -> {status.value}")
+            time.sleep(min(poll_interval, max(1.0, self.seconds_until_next())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Open and lock sessions automatically around their start time")
+    parser.add_argument("--open-before", type=float, default=DEFAULT_OPEN_BEFORE.total_seconds() / 60,
+                        help="minutes before the start a session opens")
+    parser.add_argument("--lock-after", type=float, default=DEFAULT_LOCK_AFTER.total_seconds() / 60,
+                        help="minutes after the start a session locks")
+    parser.add_argument("--poll", type=float, default=30.0, help="maximum seconds between ticks")
+    parser.add_argument("--once", action="store_true", help="apply the transitions due now and exit")
+    args = parser.parse_args()
+
+    scheduler = SessionScheduler(timedelta(minutes=args.open_before), timedelta(minutes=args.lock_after))
+    if args.once:
+        changes = scheduler.run_pending()
+        for session_id, status in changes:
+            print(f"[OK] Session {session_id} -> {status.value}")
+        print(f"{len(changes)} session(s) updated")
+        return
+
+    print(f"Scheduler running (open {args.open_before:g} min before, lock {args.lock_after:g} min after start)")
+    try:
+        scheduler.run_forever(args.poll)
+    except KeyboardInterrupt:
+        print("\nScheduler stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""Storage backends behind services.repository.
+
+Every data "file" is a sequence of text lines in the same format as the
+``data/*.txt`` files. Two backends store them:
+
+- :class:`TextStorage` (default): one plain-text file per data file.
+- :class:`SQLiteStorage`: one table per data file in a single SQLite
+  database. Each row keeps the original line plus the key columns of that
+  file, indexed for lookups by student, session, class and
+  (lecturer, status).
+
+The backend is chosen with the ``SAS_STORAGE`` environment variable
+(``text`` or ``sqlite``); ``SAS_SQLITE_PATH`` overrides the database path
+(default ``<data dir>/sas.db``).
+
+Import existing text files into SQLite with (from inside src/):
+    python -m services.storage migrate [--data-dir DIR] [--db PATH]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+# Cursor value returned by read_since when the data was rewritten since the
+# cursor was taken: the caller has to rebuild from the start.
+STALE = object()
+
+# Bytes kept from just before a text read offset to detect rewritten files.
+_SIG_LEN = 64
+
+# Data file stem -> (field delimiter, {key column: field position})
+SCHEMAS = {
+    "users": (",", {"user_id": 0, "email": 2, "role": 4}),
+    "courses": (",", {"course_id": 0}),
+    "classes": (",", {"class_id": 0, "lecturer_id": 4}),
+    "sessions": (",", {"session_id": 0, "class_id": 1}),
+    "session_status": (",", {"session_id": 0}),
+    "class_student": (",", {"class_id": 0, "student_id": 1}),
+    "attendance": (",", {"record_id": 0, "student_id": 1, "session_id": 2}),
+    "attendance_overrides": (",", {"record_id": 0}),
+    "corrections": ("|", {"request_id": 0, "student_id": 1, "session_id": 2, "status": 5, "lecturer_id": 8}),
+}
+
+# SQLite indexes per data file stem
+INDEXES = {
+    "users": [("user_id",), ("email",)],
+    "courses": [("course_id",)],
+    "classes": [("class_id",), ("lecturer_id",)],
+    "sessions": [("session_id",), ("class_id",)],
+    "session_status": [("session_id",)],
+    "class_student": [("class_id",), ("student_id",)],
+    "attendance": [("record_id",), ("student_id",), ("session_id",)],
+    "attendance_overrides": [("record_id",)],
+    "corrections": [("request_id",), ("student_id",), ("lecturer_id", "status")],
+}
+
+
+def table_name(filename: str) -> str:
+    """Data file name (or path) -> table name, e.g. 'attendance.txt' -> 'attendance'."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return "".join(ch if ch.isalnum() or ch == "_" else "_" for ch in stem)
+
+
+def _key_fields(filename: str, line: str) -> list:
+    """Extract the key column values of a line, None where the field is missing."""
+    delimiter, columns = SCHEMAS.get(table_name(filename), (",", {}))
+    parts = line.split(delimiter)
+    return [parts[pos].strip() if pos < len(parts) else None for pos in columns.values()]
+
+
+def _matches(filename: str, column: str, values) -> Callable[[str], bool]:
+    delimiter, columns = SCHEMAS[table_name(filename)]
+    pos = columns[column]
+
+    def match(line: str) -> bool:
+        parts = line.split(delimiter, pos + 1)
+        return pos < len(parts) and parts[pos].strip() in values
+
+    return match
+
+
+def _resolve_floor(floor, current: Optional[int]) -> int:
+    """An int floor always applies; a callable one only seeds a missing counter."""
+    if callable(floor):
+        return floor() if current is None else 0
+    return floor
+
+
+class TextStorage:
+    """Plain-text files in a directory, one line per record."""
+
+    name = "text"
+    # select_lines scans the whole file
+    indexed = False
+
+    def __init__(self, data_dir: str):
+        self.data_dir = os.path.abspath(data_dir)
+        self._lock = threading.RLock()
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.data_dir, filename)
+
+    def stamp(self, filename: str) -> Optional[tuple]:
+        """Return (inode, mtime_ns, size) of a file, or None if it does not exist."""
+        try:
+            st = os.stat(self.path(filename))
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def iter_lines(self, filename: str) -> Iterator[str]:
+        """Yield the stripped, non-empty lines of a file."""
+        try:
+            with open(self.path(filename), "r", encoding="utf-8") as fh:
+                for raw in fh:
+                    line = raw.strip()
+                    if line:
+                        yield line
+        except FileNotFoundError:
+            return
+
+    def select_lines(self, filename: str, column: str, values) -> Iterator[str]:
+        """Yield lines whose key ``column`` is one of ``values`` (full scan)."""
+        match = _matches(filename, column, values)
+        return (line for line in self.iter_lines(filename) if match(line))
+
+    def read_since(self, filename: str, cursor, consume: Callable[[Iterator[str]], None]):
+        """Pass the lines written after ``cursor`` to ``consume``.
+
+        ``cursor`` None reads from the start. Returns the new cursor, None if
+        the next read has to start over, or STALE (without calling
+        ``consume``) if the file was rewritten since ``cursor``.
+        """
+        try:
+            fh = open(self.path(filename), "rb")
+        except FileNotFoundError:
+            if cursor is not None:
+                return STALE
+            consume(iter(()))
+            return None
+
+        with fh:
+            st = os.fstat(fh.fileno())
+            if cursor is None:
+                offset = 0
+            else:
+                inode, offset, sig = cursor
+                if inode != st.st_ino or st.st_size < offset:
+                    return STALE
+                start = max(0, offset - len(sig))
+                fh.seek(start)
+                if fh.read(offset - start) != sig:
+                    return STALE
+            state = {"offset": offset, "partial": False}
+            incremental = cursor is not None
+
+            def lines() -> Iterator[str]:
+                pos = offset
+                for raw in fh:
+                    if not raw.endswith(b"\n"):
+                        # A writer may still be completing this line: leave
+                        # it for the next incremental read, but keep it on a
+                        # full read (files edited by hand may lack the "\n").
+                        state["partial"] = True
+                        if incremental:
+                            break
+                    else:
+                        pos += len(raw)
+                        state["offset"] = pos
+                    line = raw.decode("utf-8").strip()
+                    if line:
+                        yield line
+
+            consume(lines())
+
+            new_offset = state["offset"]
+            if state["partial"] and not incremental:
+                return None
+            start = max(0, new_offset - _SIG_LEN)
+            fh.seek(start)
+            return (st.st_ino, new_offset, fh.read(new_offset - start))
+
+    def append_lines(self, filename: str, lines: Iterable[str], sync: bool = False) -> None:
+        path = self.path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        if not data:
+            return
+        with open(path, "a+b") as fh:
+            # A file edited by hand may lack the final "\n": end that line
+            # first, or the first appended line would be glued onto it.
+            size = fh.seek(0, os.SEEK_END)
+            if size:
+                fh.seek(size - 1)
+                if fh.read(1) != b"\n":
+                    data = b"\n" + data
+            # One write() call, so a batch lands in the file as a whole
+            fh.write(data)
+            if sync:
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def write_lines(self, filename: str, lines: Iterable[str]) -> None:
+        """Replace the content of a file atomically."""
+        path = self.path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per process and thread, so concurrent rewrites never share a tmp file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "x", encoding="utf-8") as fh:
+                for line in lines:
+                    fh.write(line + "\n")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def next_sequence(self, name: str, floor, count: int) -> int:
+        """Allocate numbers from the counter kept in ``<name>.seq``."""
+        path = self.path(f"{name}.seq")
+        with self._lock:
+            current = None
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    current = int(fh.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                pass
+            first = max(current or 0, _resolve_floor(floor, current)) + 1
+            self.write_lines(f"{name}.seq", [str(first + count - 1)])
+        return first
+
+    def counters(self) -> dict:
+        """Return every persisted counter as {name: value}."""
+        result = {}
+        if os.path.isdir(self.data_dir):
+            for entry in sorted(os.listdir(self.data_dir)):
+                if entry.endswith(".seq"):
+                    try:
+                        with open(self.path(entry), "r", encoding="utf-8") as fh:
+                            result[entry[:-4]] = int(fh.read().strip() or 0)
+                    except ValueError:
+                        continue
+        return result
+
+
+class SQLiteStorage:
+    """Data files stored as tables of one SQLite database.
+
+    Each table has a ``seq`` primary key (insertion order), the original
+    ``line`` and the key columns from SCHEMAS. The ``_tables`` table tracks a
+    generation (bumped on rewrites) and a version (bumped on every write) per
+    table, which serve as cache stamps across processes.
+    """
+
+    name = "sqlite"
+    # select_lines on a key column is an index lookup
+    indexed = True
+
+    def __init__(self, db_path: str):
+        self.db_path = os.path.abspath(db_path)
+        self._local = threading.local()
+        self._created = set()
+        self._lock = threading.RLock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS _tables ("
+                         "name TEXT PRIMARY KEY, generation INTEGER NOT NULL, version INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS _sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def _table(self, filename: str) -> str:
+        """Return the table for a data file, creating it and its indexes once."""
+        table = table_name(filename)
+        if table not in self._created:
+            with self._lock:
+                columns = list(SCHEMAS.get(table, (",", {}))[1])
+                column_sql = "".join(f", {col} TEXT" for col in columns)
+                conn = self._conn()
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                             f"(seq INTEGER PRIMARY KEY AUTOINCREMENT, line TEXT NOT NULL{column_sql})")
+                for index in INDEXES.get(table, []):
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(index)} "
+                                 f"ON {table} ({', '.join(index)})")
+                self._created.add(table)
+        return table
+
+    def _generation(self, conn: sqlite3.Connection, table: str) -> Optional[tuple]:
+        row = conn.execute("SELECT generation, version FROM _tables WHERE name = ?", (table,)).fetchone()
+        return tuple(row) if row else None
+
+    def stamp(self, filename: str) -> Optional[tuple]:
+        return self._generation(self._conn(), table_name(filename))
+
+    def iter_lines(self, filename: str) -> Iterator[str]:
+        table = self._table(filename)
+        for (line,) in self._conn().execute(f"SELECT line FROM {table} ORDER BY seq"):
+            yield line
+
+    def select_lines(self, filename: str, column: str, values) -> Iterator[str]:
+        """Yield lines whose key ``column`` is one of ``values`` (indexed)."""
+        table = self._table(filename)
+        if column not in SCHEMAS.get(table, (",", {}))[1]:
+            raise ValueError(f"{table} has no key column {column}")
+        # One JSON array parameter, so any number of values stays a single
+        # query with a single ORDER BY (file order, as the text backend)
+        query = (f"SELECT line FROM {table} WHERE {column} IN (SELECT value FROM json_each(?)) "
+                 f"ORDER BY seq")
+        for (line,) in self._conn().execute(query, (json.dumps(list(values)),)):
+            yield line
+
+    def read_since(self, filename: str, cursor, consume: Callable[[Iterator[str]], None]):
+        """Same contract as TextStorage.read_since; cursor is (generation, last seq)."""
+        table = self._table(filename)
+        conn = self._conn()
+        stamp = self._generation(conn, table)
+        generation = stamp[0] if stamp else 0
+        last_seq = 0
+        if cursor is not None:
+            if cursor[0] != generation:
+                return STALE
+            last_seq = cursor[1]
+        state = {"last": last_seq}
+
+        def lines() -> Iterator[str]:
+            for seq, line in conn.execute(f"SELECT seq, line FROM {table} WHERE seq > ? ORDER BY seq",
+                                          (last_seq,)):
+                state["last"] = seq
+                yield line
+
+        consume(lines())
+        return (generation, state["last"])
+
+    def _insert(self, conn: sqlite3.Connection, filename: str, table: str, lines: Iterable[str]) -> None:
+        columns = list(SCHEMAS.get(table, (",", {}))[1])
+        names = "".join(f", {col}" for col in columns)
+        marks = ", ?" * len(columns)
+        rows = ([line, *_key_fields(filename, line)]
+                for line in (raw.strip() for raw in lines) if line)
+        conn.executemany(f"INSERT INTO {table} (line{names}) VALUES (?{marks})", rows)
+
+    def _bump(self, conn: sqlite3.Connection, table: str, rewrite: bool) -> None:
+        conn.execute(
+            "INSERT INTO _tables (name, generation, version) VALUES (?, 1, 1) "
+            "ON CONFLICT(name) DO UPDATE SET generation = generation + ?, version = version + 1",
+            (table, 1 if rewrite else 0),
+        )
+
+    def append_lines(self, filename: str, lines: Iterable[str], sync: bool = False) -> None:
+        table = self._table(filename)
+        conn = self._conn()
+        if sync:
+            # WAL with synchronous=NORMAL does not fsync on commit
+            conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(conn, filename, table, lines)
+            self._bump(conn, table, rewrite=False)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            if sync:
+                conn.execute("PRAGMA synchronous=NORMAL")
+
+    def write_lines(self, filename: str, lines: Iterable[str]) -> None:
+        table = self._table(filename)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DELETE FROM {table}")
+            self._insert(conn, filename, table, lines)
+            self._bump(conn, table, rewrite=True)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def next_sequence(self, name: str, floor, count: int) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM _sequences WHERE name = ?", (name,)).fetchone()
+            current = row[0] if row else None
+            first = max(current or 0, _resolve_floor(floor, current)) + 1
+            conn.execute("INSERT INTO _sequences (name, value) VALUES (?, ?) "
+                         "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                         (name, first + count - 1))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return first
+
+    def set_counter(self, name: str, value: int) -> None:
+        self._conn().execute("INSERT INTO _sequences (name, value) VALUES (?, ?) "
+                             "ON CONFLICT(name) DO UPDATE SET value = excluded.value", (name, value))
+
+
+def from_environment(data_dir: str):
+    """Build the backend selected by SAS_STORAGE for ``data_dir``."""
+    backend = os.environ.get("SAS_STORAGE", "text").strip().lower()
+    if backend == "text":
+        return TextStorage(data_dir)
+    if backend == "sqlite":
+        return SQLiteStorage(os.environ.get("SAS_SQLITE_PATH") or os.path.join(data_dir, "sas.db"))
+    raise ValueError(f"Unknown SAS_STORAGE backend: {backend!r} (expected 'text' or 'sqlite')")
+
+
+def migrate_text_to_sqlite(data_dir: str, db_path: str) -> dict:
+    """Import every ``*.txt`` file and ``*.seq`` counter of ``data_dir`` into SQLite.
+
+    Tables that already exist in the database are replaced.
+    Returns {file name: number of lines imported}.
+    """
+    source = TextStorage(data_dir)
+    target = SQLiteStorage(db_path)
+    counts = {}
+    for entry in sorted(os.listdir(source.data_dir)):
+        if entry.endswith(".txt"):
+            lines = list(source.iter_lines(entry))
+            target.write_lines(entry, lines)
+            counts[entry] = len(lines)
+    for name, value in source.counters().items():
+        target.set_counter(name, value)
+    return counts
+
+
+def main() -> None:
+    default_dir = os.environ.get("SAS_DATA_DIR") or os.path.join(os.path.dirname(__file__), "..", "data")
+    parser = argparse.ArgumentParser(description="Storage backend tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="import the .txt data files into an SQLite database")
+    migrate.add_argument("--data-dir", default=default_dir, help="directory with the .txt files")
+    migrate.add_argument("--db", help="SQLite database to write (default: <data dir>/sas.db)")
+    args = parser.parse_args()
+
+    db_path = args.db or os.environ.get("SAS_SQLITE_PATH") or os.path.join(args.data_dir, "sas.db")
+    counts = migrate_text_to_sqlite(args.data_dir, db_path)
+    for filename, count in counts.items():
+        print(f"{filename:<20} {count:>10,} rows")
+    print(f"[OK] Imported into {os.path.abspath(db_path)}")
+    print("Set SAS_STORAGE=sqlite to use it.")
+
+
+if __name__ == "__main__":
+    main()
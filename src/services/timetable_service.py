@@ -1,145 +1,457 @@
-import os
-from datetime import datetime
-from typing import Optional
+import heapq
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Iterable, Optional
 
+from models.academic import SessionStatus
 from models.attendance import TIME_FMT
+from services.repository import append_lines, is_tombstone, iter_lines, load_incremental, locked, write_lines
+from services.user_directory import get_user_names
 
-def _data_path(filename: str) -> str:
-	root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
-	return os.path.join(root, filename)
+# Status changes made after sessions.txt was written (e.g. by the session
+# scheduler) are appended here as "session_id,status,changed_at"; the latest
+# line of a session wins over the status column of sessions.txt.
+SESSION_STATUS_FILE = "session_status.txt"
 
+# Minimum fields of a courses.txt / classes.txt line. Both files are record
+# files: the last line of an id wins and "<id>,#deleted" removes the record.
+COURSE_FIELDS = 3
+CLASS_FIELDS = 5
+
+
+def _split(line: str) -> list[str]:
+	return [p.strip() for p in line.split(",")]
+
+
+def _course_row(parts: list[str]) -> dict:
+	return {
+		"id": parts[0],
+		"name": parts[1],
+		"credits": parts[2]
+	}
+
+
+def _class_row(parts: list[str]) -> dict:
+	return {
+		"id": parts[0],
+		"name": parts[1],
+		"semester": parts[2],
+		"course_id": parts[3],
+		"lecturer_id": parts[4]
+	}
+
+
+def _new_record_table() -> dict:
+	# views: lists/maps derived from by_id on first use after a change
+	return {"by_id": {}, "views": {}, "lines": 0, "max_num": 0}
+
+
+def _feed_records(table: dict, lines, min_fields: int, make_row, id_prefix: str) -> None:
+	"""Add lines of a record file: the last line of an id wins, a tombstone removes it."""
+	by_id = table["by_id"]
+	for line in lines:
+		table["lines"] += 1
+		parts = _split(line)
+		if is_tombstone(parts):
+			by_id.pop(parts[0], None)
+		elif len(parts) >= min_fields:
+			by_id[parts[0]] = make_row(parts)
+			number = parts[0][len(id_prefix):]
+			if parts[0].startswith(id_prefix) and number.isdigit():
+				table["max_num"] = max(table["max_num"], int(number))
+	table["views"] = {}
+
+
+def _feed_courses(table: dict, lines) -> None:
+	_feed_records(table, lines, COURSE_FIELDS, _course_row, "C")
+
+
+def _feed_classes(table: dict, lines) -> None:
+	_feed_records(table, lines, CLASS_FIELDS, _class_row, "CL")
+
+
+def _course_table() -> dict:
+	return load_incremental("courses.txt", _new_record_table, _feed_courses)
+
+
+def _class_table() -> dict:
+	return load_incremental("classes.txt", _new_record_table, _feed_classes)
+
+
+def _view(table: dict, name: str, build):
+	views = table["views"]
+	value = views.get(name)
+	if value is None:
+		value = views[name] = build(table["by_id"])
+	return value
+
+
+def _rows(by_id: dict) -> list[dict]:
+	return list(by_id.values())
+
+
+def _course_names(by_id: dict) -> dict:
+	return {cid: c["name"] for cid, c in by_id.items()}
+
+
+def _classes_by_lecturer(by_id: dict) -> dict:
+	by_lecturer = {}
+	for cls in by_id.values():
+		by_lecturer.setdefault(cls["lecturer_id"], []).append(cls["id"])
+	return by_lecturer
 
-def load_courses() -> list[dict]:
 
-	path = _data_path("courses.txt")
-	courses = []
-	try:
-		with open(path, "r", encoding="utf-8") as fh:
-			for raw in fh:
-				line = raw.strip()
-				if not line:
-					continue
-				parts = [p.strip() for p in line.split(",")]
-				if len(parts) >= 3:
-					courses.append({
-						"id": parts[0],
-						"name": parts[1],
-						"credits": parts[2]
-					})
-	except FileNotFoundError:
-		pass
-	return courses
+def _session_key(row: dict) -> tuple:
+	return (row["date_str"], row["time_str"])
+
+
+def _datetime_key(value: datetime) -> tuple:
+	return (value.strftime("%Y-%m-%d"), value.strftime("%H:%M"))
+
+
+def _new_session_table() -> dict:
+	return {"rows": [], "by_id": {}, "by_class": {}, "by_date": []}
+
+
+def _feed_sessions(table: dict, lines) -> None:
+	"""Add sessions.txt lines to the row list, the id index and the date-sorted lists."""
+	rows = table["rows"]
+	by_id = table["by_id"]
+	by_class = table["by_class"]
+	first_new = len(rows)
+	for line in lines:
+		parts = _split(line)
+		if len(parts) >= 7:
+			row = {
+				"id": parts[0],
+				"class_id": parts[1],
+				"date_str": parts[2],
+				"time_str": parts[3],
+				"week": parts[4],
+				"room": parts[5],
+				"status": parts[6]
+			}
+			rows.append(row)
+			# each class keeps its sessions sorted by (date, time)
+			insort(by_class.setdefault(row["class_id"], []), row, key=_session_key)
+		if len(parts) < 4 or parts[0] in by_id:
+			# first occurrence of an id wins, as with the old linear scan
+			continue
+		# parts: id, class_id, date(YYYY-MM-DD), time(HH:MM), ... , status
+		date_str = parts[2]
+		time_str = parts[3]
+		try:
+			start_dt = datetime.strptime(f"{date_str} {time_str}", TIME_FMT)
+		except ValueError:
+			# fallback: try iso
+			try:
+				start_dt = datetime.fromisoformat(f"{date_str}T{time_str}")
+			except ValueError:
+				continue
+		by_id[parts[0]] = {
+			"id": parts[0],
+			"class_id": parts[1],
+			"date_str": date_str,
+			"time_str": time_str,
+			"start_datetime": start_dt,
+			"status": parts[-1],
+		}
+
+	if len(rows) > first_new:
+		# sessions.txt is mostly in date order, so this sort is close to linear
+		by_date = table["by_date"]
+		by_date.extend(rows[first_new:])
+		by_date.sort(key=_session_key)
+
+
+def _new_enrollment_index() -> dict:
+	return {"pairs": [], "by_class": {}, "by_student": {}}
+
+
+def _feed_enrollments(index: dict, lines) -> None:
+	"""Add class_student.txt lines to the pair list and both lookup directions."""
+	pairs = index["pairs"]
+	by_class = index["by_class"]
+	by_student = index["by_student"]
+	for line in lines:
+		parts = _split(line)
+		if len(parts) >= 2:
+			class_id, student_id = parts[0], parts[1]
+			pairs.append((class_id, student_id))
+			by_class.setdefault(class_id, []).append(student_id)
+			by_student.setdefault(student_id, []).append(class_id)
+
+
+# The loaders below return cached lists shared by every caller: do not mutate.
+
+def load_courses() -> list[dict]:
+	return _view(_course_table(), "rows", _rows)
 
 
 def load_classes() -> list[dict]:
+	return _view(_class_table(), "rows", _rows)
+
+
+def get_course_by_id(course_id: str) -> Optional[dict]:
+	return _course_table()["by_id"].get(course_id)
+
+
+def get_class_by_id(class_id: str) -> Optional[dict]:
+	return _class_table()["by_id"].get(class_id)
+
+
+def record_line_counts(filename: str) -> tuple:
+	"""Return (lines, live records) of courses.txt or classes.txt."""
+	table = _course_table() if filename == "courses.txt" else _class_table()
+	return table["lines"], len(table["by_id"])
+
+
+def max_record_number(filename: str) -> int:
+	"""Return the highest N of the C<N> (courses.txt) or CL<N> (classes.txt) ids in the file."""
+	table = _course_table() if filename == "courses.txt" else _class_table()
+	return table["max_num"]
+
+
+def _new_status_log() -> dict:
+	return {"changes": []}
+
 
-	path = _data_path("classes.txt")
-	classes = []
-	try:
-		with open(path, "r", encoding="utf-8") as fh:
-			for raw in fh:
-				line = raw.strip()
-				if not line:
-					continue
-				parts = [p.strip() for p in line.split(",")]
-				if len(parts) >= 5:
-					classes.append({
-						"id": parts[0],
-						"name": parts[1],
-						"semester": parts[2],
-						"course_id": parts[3],
-						"lecturer_id": parts[4]
-					})
-	except FileNotFoundError:
-		pass
-	return classes
+def _feed_status_log(status_log: dict, lines) -> None:
+	changes = status_log["changes"]
+	for line in lines:
+		parts = _split(line)
+		if len(parts) >= 2:
+			changes.append((parts[0], parts[1]))
+
+
+def _apply_status_changes(table: dict, changes) -> None:
+	by_id = table["by_id"]
+	by_class = table["by_class"]
+	for session_id, status in changes:
+		sess = by_id.get(session_id)
+		if sess is None:
+			continue
+		sess["status"] = status
+		for row in by_class.get(sess["class_id"], []):
+			if row["id"] == session_id:
+				row["status"] = status
+
+
+def _session_table() -> dict:
+	table = load_incremental("sessions.txt", _new_session_table, _feed_sessions)
+	status_log = load_incremental(SESSION_STATUS_FILE, _new_status_log, _feed_status_log)
+
+	# Apply the status changes this table has not seen yet (all of them if
+	# either file was reloaded from scratch)
+	changes = status_log["changes"]
+	applied = table.get("status_applied")
+	if applied is None or applied[0] is not status_log or applied[1] < len(changes):
+		done = applied[1] if applied is not None and applied[0] is status_log else 0
+		_apply_status_changes(table, changes[done:])
+		table["status_applied"] = (status_log, len(changes))
+	return table
+
+
+def set_session_statuses(changes: Iterable[tuple[str, SessionStatus]]) -> int:
+	"""Change the status of sessions with a single append to session_status.txt.
+
+	Args:
+		changes: (session_id, SessionStatus) pairs
+
+	Returns the number of changes written.
+	"""
+	stamp = datetime.now().strftime(TIME_FMT)
+	lines = [f"{session_id},{status.value},{stamp}" for session_id, status in changes]
+	# Same lock as compact_session_statuses, so no change is appended between its two writes
+	with locked("sessions"):
+		append_lines(SESSION_STATUS_FILE, lines)
+	return len(lines)
+
+
+def compact_session_statuses() -> int:
+	"""Fold session_status.txt into the status column of sessions.txt.
+
+	Runs under locked("sessions"), which set_session_statuses also holds.
+	Returns the number of status lines folded in.
+	"""
+	with locked("sessions"):
+		changes = load_incremental(SESSION_STATUS_FILE, _new_status_log, _feed_status_log)["changes"]
+		if not changes:
+			return 0
+		latest = dict(changes)
+		lines = []
+		for line in iter_lines("sessions.txt"):
+			parts = _split(line)
+			status = latest.get(parts[0]) if len(parts) >= 7 else None
+			if status is not None:
+				parts[-1] = status
+				line = ",".join(parts)
+			lines.append(line)
+		write_lines("sessions.txt", lines)
+		write_lines(SESSION_STATUS_FILE, [])
+		return len(changes)
 
 
 def load_sessions() -> list[dict]:
+	return _session_table()["rows"]
+
+
+def _enrollment_index() -> dict:
+	return load_incremental("class_student.txt", _new_enrollment_index, _feed_enrollments)
 
-	path = _data_path("sessions.txt")
-	sessions = []
-	try:
-		with open(path, "r", encoding="utf-8") as fh:
-			for raw in fh:
-				line = raw.strip()
-				if not line:
-					continue
-				parts = [p.strip() for p in line.split(",")]
-				if len(parts) >= 7:
-					sessions.append({
-						"id": parts[0],
-						"class_id": parts[1],
-						"date_str": parts[2],
-						"time_str": parts[3],
-						"week": parts[4],
-						"room": parts[5],
-						"status": parts[6]
-					})
-	except FileNotFoundError:
-		pass
-	return sessions
+
+def load_enrollments() -> list[tuple]:
+	"""Return (class_id, student_id) pairs from class_student.txt."""
+	return _enrollment_index()["pairs"]
+
+
+def get_class_students(class_id: str) -> list[str]:
+	"""Return the ids of the students enrolled in a class, in file order."""
+	return _enrollment_index()["by_class"].get(class_id, [])
+
+
+def get_student_classes(student_id: str) -> list[str]:
+	"""Return the ids of the classes a student is enrolled in, in file order."""
+	return _enrollment_index()["by_student"].get(student_id, [])
+
+
+def get_class_sessions(class_id: str) -> list[dict]:
+	"""Return the sessions of a class, sorted by date and time (shared list: do not mutate)."""
+	return _session_table()["by_class"].get(class_id, [])
 
 
 def get_session_by_id(session_id: str) -> Optional[dict]:
-	
-	path = _data_path("sessions.txt")
-	try:
-		with open(path, "r", encoding="utf-8") as fh:
-			for raw in fh:
-				line = raw.strip()
-				if not line:
-					continue
-				parts = [p.strip() for p in line.split(",")]
-				if parts[0] == session_id:
-					# parts: id, class_id, date(YYYY-MM-DD), time(HH:MM), ... , status
-					sid = parts[0]
-					class_id = parts[1]
-					date_str = parts[2]
-					time_str = parts[3]
-					status = parts[-1]
-					try:
-						start_dt = datetime.strptime(f"{date_str} {time_str}", TIME_FMT)
-					except Exception:
-						# fallback: try iso
-						start_dt = datetime.fromisoformat(f"{date_str}T{time_str}")
-					return {
-						"id": sid,
-						"class_id": class_id,
-						"date_str": date_str,
-						"time_str": time_str,
-						"start_datetime": start_dt,
-						"status": status,
-					}
-	except FileNotFoundError:
-		return None
-
-
-def get_student_timetable(student_id: str) -> list[dict]:
-	
-	# Find all classes this student is enrolled in
-	cs_path = _data_path("class_student.txt")
-	student_classes = []
-	try:
-		with open(cs_path, "r", encoding="utf-8") as fh:
-			for raw in fh:
-				line = raw.strip()
-				if not line:
-					continue
-				parts = [p.strip() for p in line.split(",")]
-				if len(parts) >= 2 and parts[1] == student_id:
-					student_classes.append(parts[0])
-	except FileNotFoundError:
-		return []
+	"""Look up a session (with its parsed start_datetime) in the session index."""
+	return _session_table()["by_id"].get(session_id)
+
+
+def _slice_range(sessions: list[dict], start: Optional[datetime], end: Optional[datetime]) -> tuple:
+	"""Bisect a date-sorted session list: index range of sessions in [start, end)."""
+	lo = bisect_left(sessions, _datetime_key(start), key=_session_key) if start else 0
+	hi = bisect_left(sessions, _datetime_key(end), key=_session_key) if end else len(sessions)
+	return lo, hi
+
 
-	# Get all sessions for these classes
-	all_sessions = load_sessions()
-	student_sessions = [
-		sess for sess in all_sessions
-		if sess.get("class_id") in student_classes
-	]
+def _sessions_of_classes(
+	class_ids: Iterable[str], start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> Iterable[dict]:
+	"""Merge the date-sorted session lists of several classes, limited to [start, end)."""
+	by_class = _session_table()["by_class"]
+	lists = []
+	for cid in dict.fromkeys(class_ids):
+		sessions = by_class.get(cid)
+		if sessions:
+			lo, hi = _slice_range(sessions, start, end)
+			if lo < hi:
+				lists.append(sessions[lo:hi])
+	if len(lists) == 1:
+		return iter(lists[0])
+	return heapq.merge(*lists, key=_session_key)
 
-	return student_sessions
+
+def _next_sessions_of_classes(class_ids: Iterable[str], count: int, after: Optional[datetime] = None) -> list[dict]:
+	"""The first ``count`` sessions of the classes starting at or after ``after`` (default: now)."""
+	by_class = _session_table()["by_class"]
+	after = after or datetime.now()
+	tails = []
+	for cid in dict.fromkeys(class_ids):
+		sessions = by_class.get(cid)
+		if sessions:
+			lo = bisect_left(sessions, _datetime_key(after), key=_session_key)
+			tails.append(map(sessions.__getitem__, range(lo, len(sessions))))
+	return list(islice(heapq.merge(*tails, key=_session_key), count))
+
+
+def day_range(day: Optional[date] = None) -> tuple[datetime, datetime]:
+	"""[start, end) of a day (default: today), for the range queries below."""
+	day = day or date.today()
+	start = datetime(day.year, day.month, day.day)
+	return start, start + timedelta(days=1)
+
+
+def week_range(day: Optional[date] = None) -> tuple[datetime, datetime]:
+	"""[Monday 00:00, next Monday 00:00) of the week containing ``day`` (default: today)."""
+	start, _ = day_range(day)
+	start -= timedelta(days=start.weekday())
+	return start, start + timedelta(days=7)
+
+
+def get_sessions_between(start: datetime, end: datetime) -> list[dict]:
+	"""All sessions starting in [start, end), sorted by date and time."""
+	by_date = _session_table()["by_date"]
+	lo, hi = _slice_range(by_date, start, end)
+	return by_date[lo:hi]
+
+
+def get_student_timetable(
+	student_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> list[dict]:
+	"""Return the sessions of every class the student is enrolled in, sorted by date and time.
+
+	``start`` / ``end`` limit the result to sessions starting in [start, end).
+	"""
+	return list(_sessions_of_classes(get_student_classes(student_id), start, end))
+
+
+def _schedule_rows(sessions: Iterable[dict]) -> list[dict]:
+	"""Join sessions with their class and course for display."""
+	classes = _class_table()["by_id"]
+	course_names = _view(_course_table(), "names", _course_names)
+	rows = []
+	for sess in sessions:
+		class_info = classes.get(sess["class_id"])
+		rows.append({
+			"session_id": sess["id"],
+			"class_id": sess["class_id"],
+			"class_name": class_info["name"] if class_info else "",
+			"course_name": course_names.get(class_info["course_id"], "Unknown") if class_info else "Unknown",
+			"date": sess["date_str"],
+			"time": sess["time_str"],
+			"week": sess["week"],
+			"room": sess["room"],
+			"status": sess["status"],
+		})
+	return rows
+
+
+def get_student_schedule(
+	student_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> list[dict]:
+	"""Timetable rows (session, class, course name, room, ...) of a student, sorted by date and time.
+
+	``start`` / ``end`` limit the rows to sessions starting in [start, end),
+	e.g. ``get_student_schedule(sid, *week_range())``.
+	"""
+	return _schedule_rows(_sessions_of_classes(get_student_classes(student_id), start, end))
+
+
+def get_student_next_sessions(student_id: str, count: int = 5, after: Optional[datetime] = None) -> list[dict]:
+	"""Timetable rows of the student's next ``count`` sessions from ``after`` (default: now)."""
+	return _schedule_rows(_next_sessions_of_classes(get_student_classes(student_id), count, after))
+
+
+def get_lecturer_classes(lecturer_id: str) -> list[dict]:
+	"""Return the classes taught by a lecturer."""
+	table = _class_table()
+	by_id = table["by_id"]
+	return [by_id[cid] for cid in _view(table, "by_lecturer", _classes_by_lecturer).get(lecturer_id, [])]
+
+
+def _lecturer_class_ids(lecturer_id: str) -> list[str]:
+	return _view(_class_table(), "by_lecturer", _classes_by_lecturer).get(lecturer_id, [])
+
+
+def get_lecturer_schedule(
+	lecturer_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> list[dict]:
+	"""Teaching schedule rows of a lecturer, sorted by date and time, optionally limited to [start, end)."""
+	return _schedule_rows(_sessions_of_classes(_lecturer_class_ids(lecturer_id), start, end))
+
+
+def get_lecturer_next_sessions(lecturer_id: str, count: int = 5, after: Optional[datetime] = None) -> list[dict]:
+	"""Schedule rows of the lecturer's next ``count`` sessions from ``after`` (default: now)."""
+	return _schedule_rows(_next_sessions_of_classes(_lecturer_class_ids(lecturer_id), count, after))
 
 
 def get_students_in_session(session_id: str) -> list[tuple]:
@@ -148,35 +460,8 @@ def get_students_in_session(session_id: str) -> list[tuple]:
 	if not sess:
 		return []
 	class_id = sess.get("class_id")
-	data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
-	cs_path = os.path.join(data_dir, "class_student.txt")
-	users_path = os.path.join(data_dir, "users.txt")
-
-	student_ids = []
-	try:
-		with open(cs_path, "r", encoding="utf-8") as fh:
-			for raw in fh:
-				line = raw.strip()
-				if not line:
-					continue
-				parts = [p.strip() for p in line.split(",")]
-				if parts[0] == class_id and len(parts) > 1:
-					student_ids.append(parts[1])
-	except FileNotFoundError:
-		return []
 
-	# build id->name map
-	id_name = {}
-	try:
-		with open(users_path, "r", encoding="utf-8") as fh:
-			for raw in fh:
-				line = raw.strip()
-				if not line:
-					continue
-				parts = [p.strip() for p in line.split(",")]
-				if len(parts) >= 2:
-					id_name[parts[0]] = parts[1]
-	except FileNotFoundError:
-		pass
+	student_ids = get_class_students(class_id)
+	id_name = get_user_names()
 
 	return [(sid, id_name.get(sid, "")) for sid in student_ids]
@@ -0,0 +1,115 @@
+"""The users of users.txt, indexed by id, email and role.
+
+Every service that needs users reads them through this module, so the file
+has one parser. The indexes are built once per process and then kept up to
+date incrementally: appended lines (a registration, an admin add) are fed
+into the existing indexes, and only a rewrite of the file rebuilds them.
+
+Lines have the form ``id,name,email,password,role``. Fields after the role
+are ignored and lines with fewer fields are skipped. When an id appears on
+more than one line, the last line wins, and a tombstone line ``id,#deleted``
+removes the user (see repository.compact_records).
+
+The returned User objects are shared by every caller: do not mutate them.
+"""
+from typing import Dict, List, Optional
+
+from models.user import User, Student, Lecturer, Admin
+from services.repository import is_tombstone, load_incremental
+
+USERS_FILE = "users.txt"
+USER_FIELDS = 5
+
+_USER_CLASSES = {"student": Student, "lecturer": Lecturer, "admin": Admin}
+
+
+def make_user(user_id: str, name: str, email: str, password: str, role: str) -> User:
+    """Build the User subclass matching ``role``."""
+    cls = _USER_CLASSES.get(role)
+    if cls is None:
+        return User(user_id, name, email, password, role)
+    return cls(user_id, name, email, password)
+
+
+def format_user(u: User) -> str:
+    """Return the users.txt line of a user."""
+    return f"{u.id},{u.name},{u.email},{u.password},{u.role}"
+
+
+def _new_directory() -> dict:
+    return {"by_id": {}, "by_email": {}, "by_role": {}, "names": {}, "max_num": 0, "lines": 0}
+
+
+def _feed_users(directory: dict, lines) -> None:
+    """Add users.txt lines to the id, email and role indexes."""
+    by_id = directory["by_id"]
+    by_email = directory["by_email"]
+    by_role = directory["by_role"]
+    names = directory["names"]
+    for line in lines:
+        directory["lines"] += 1
+        parts = [p.strip() for p in line.split(",")]
+        deleted = is_tombstone(parts)
+        if len(parts) < USER_FIELDS and not deleted:
+            continue
+
+        old = by_id.pop(parts[0], None) if deleted else by_id.get(parts[0])
+        if old is not None:
+            if by_email.get(old.email) is old:
+                del by_email[old.email]
+            by_role[old.role].pop(old.id, None)
+            names.pop(old.id, None)
+        if deleted:
+            continue
+
+        u = make_user(*parts[:USER_FIELDS])
+        by_id[u.id] = u
+        # Same rule as the old login loop: a duplicate email keeps the first user
+        by_email.setdefault(u.email, u)
+        by_role.setdefault(u.role, {})[u.id] = u
+        names[u.id] = u.name
+
+        if u.id.startswith("U") and u.id[1:].isdigit():
+            directory["max_num"] = max(directory["max_num"], int(u.id[1:]))
+
+
+def _directory() -> dict:
+    return load_incremental(USERS_FILE, _new_directory, _feed_users)
+
+
+def list_users() -> List[User]:
+    """Return every user, in file order."""
+    return list(_directory()["by_id"].values())
+
+
+def get_user(user_id: str) -> Optional[User]:
+    return _directory()["by_id"].get(user_id)
+
+
+def find_by_email(email: str) -> Optional[User]:
+    return _directory()["by_email"].get(email)
+
+
+def users_with_role(role: str) -> List[User]:
+    """Return the users with this role, in file order."""
+    return list(_directory()["by_role"].get(role, {}).values())
+
+
+def count_by_role() -> Dict[str, int]:
+    return {role: len(users) for role, users in _directory()["by_role"].items()}
+
+
+def get_user_names() -> Dict[str, str]:
+    """Return the shared user id -> name map."""
+    return _directory()["names"]
+
+
+def max_user_number() -> int:
+    """Return the highest N of the ``UNNN`` user ids in users.txt."""
+    return _directory()["max_num"]
+
+
+def line_counts() -> tuple:
+    """Return (lines in users.txt, live users)."""
+    directory = _directory()
+    return directory["lines"], len(directory["by_id"])
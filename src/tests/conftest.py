@@ -0,0 +1,43 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Import the services script-style, as main.py does from inside src/. With the
+# project root on sys.path some modules would also load as src.services.*, a
+# second copy whose repository the data_dir fixture does not redirect.
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != ROOT_DIR]
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Never run against src/data, even before a test selects its own directory
+os.environ["SAS_DATA_DIR"] = tempfile.mkdtemp(prefix="sas-tests-")
+atexit.register(shutil.rmtree, os.environ["SAS_DATA_DIR"], True)
+os.environ["SAS_STORAGE"] = "text"
+
+from services import repository  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Point the repository at an empty data directory for one test."""
+    previous = repository.get_data_dir()
+    repository.set_data_dir(str(tmp_path))
+    yield tmp_path
+    repository.set_data_dir(previous)
+
+
+def write_file(data_dir, filename, text):
+    """Write ``text`` as is, e.g. without the final newline of a hand-edited file."""
+    with open(os.path.join(data_dir, filename), "w", encoding="utf-8") as fh:
+        fh.write(text)
+
+
+def read_file(data_dir, filename):
+    with open(os.path.join(data_dir, filename), "r", encoding="utf-8") as fh:
+        return fh.read()
@@ -0,0 +1,40 @@
+from conftest import read_file, write_file
+from services import admin_service, user_directory
+
+COURSES = "C001,Python Programming,3\nC002,Database Systems,3\n"
+
+
+def test_delete_appends_tombstone_and_hides_record(data_dir):
+    write_file(data_dir, "courses.txt", COURSES)
+    assert admin_service.delete_course("C001")
+    assert read_file(data_dir, "courses.txt") == COURSES + "C001,#deleted\n"
+    assert [c["id"] for c in admin_service.list_courses()] == ["C002"]
+    assert not admin_service.delete_course("C001")
+
+
+def test_deleted_ids_are_not_reused(data_dir):
+    write_file(data_dir, "courses.txt", COURSES)
+    admin_service.delete_course("C002")
+    assert admin_service.add_course("Networks", "2")
+    assert [c["id"] for c in admin_service.list_courses()] == ["C001", "C003"]
+
+
+def test_delete_compacts_once_dead_lines_outnumber_live(data_dir, monkeypatch):
+    monkeypatch.setattr(admin_service, "COMPACT_MIN_STALE", 3)
+    write_file(data_dir, "courses.txt", COURSES + "C003,Networks,2\nC004,Compilers,4\n")
+    admin_service.delete_course("C001")
+    # 5 lines, 3 live: 2 dead lines are not more than max(3, 3)
+    assert read_file(data_dir, "courses.txt").count("\n") == 5
+    admin_service.delete_course("C002")
+    # 6 lines, 2 live: 4 dead lines are more than max(3, 2)
+    assert read_file(data_dir, "courses.txt") == "C003,Networks,2\nC004,Compilers,4\n"
+
+
+def test_user_tombstone_frees_email(data_dir):
+    write_file(data_dir, "users.txt", "U001,Nguyen Van A,a@gmail.com,123456,student\n")
+    assert admin_service.delete_user("U001")
+    assert user_directory.find_by_email("a@gmail.com") is None
+    assert admin_service.add_user("Nguyen Van A", "a@gmail.com", "123456", "student")
+    assert [u.id for u in user_directory.list_users()] == ["U002"]
+    assert admin_service.compact_data_files()["users.txt"] == 2
+    assert read_file(data_dir, "users.txt").startswith("U002,Nguyen Van A,a@gmail.com,")
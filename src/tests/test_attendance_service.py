@@ -0,0 +1,126 @@
+import multiprocessing
+import threading
+from datetime import datetime
+
+import pytest
+
+from conftest import read_file, write_file
+from models.attendance import AttendanceState
+from services import attendance_service, repository
+from services.attendance_service import (
+    get_student_history, has_checked_in, iter_attendance_records, student_checkin, update_attendance_states,
+    write_checkins
+)
+from services.storage import SQLiteStorage
+
+SESSIONS = "S001,CL001,2024-11-10,08:00,Week1,RoomA,Open\nS002,CL001,2024-11-17,08:00,Week2,RoomA,Open\n"
+ATTENDANCE = "A007,U001,S001,2024-11-10 08:01,Present,\n"
+
+
+@pytest.fixture
+def sqlite_dir(data_dir):
+    repository.set_storage(SQLiteStorage(str(data_dir / "sas.db")))
+    repository.write_lines("sessions.txt", SESSIONS.splitlines())
+    repository.write_lines("attendance.txt", ATTENDANCE.splitlines())
+    yield data_dir
+
+
+def _no_full_scan(monkeypatch):
+    def scan():
+        raise AssertionError("attendance.txt loaded in full")
+
+    monkeypatch.setattr(attendance_service, "_checkin_index", scan)
+
+
+def test_checkin_once_per_session(data_dir):
+    write_file(data_dir, "sessions.txt", SESSIONS)
+    write_file(data_dir, "attendance.txt", ATTENDANCE)
+    assert not student_checkin("U001", "S001")[0]
+    assert student_checkin("U001", "S002")[0]
+    assert not student_checkin("U001", "S002")[0]
+    assert has_checked_in("U001", "S002")
+
+
+def test_indexed_checkin_reads_only_its_session(sqlite_dir, monkeypatch):
+    repository.get_storage().set_counter("attendance", 7)
+    _no_full_scan(monkeypatch)
+    assert has_checked_in("U001", "S001")
+    assert not has_checked_in("U001", "S002")
+    assert student_checkin("U001", "S002")[0]
+    assert not student_checkin("U001", "S002")[0]
+    assert [line.split(",")[0] for line in repository.iter_lines("attendance.txt")] == ["A007", "A008"]
+
+
+def _record_ids_and_pairs(data_dir):
+    parts = [line.split(",") for line in read_file(data_dir, "attendance.txt").splitlines()]
+    return [p[0] for p in parts], [(p[1], p[2]) for p in parts]
+
+
+def _checkins(worker: int):
+    # Every worker submits every student once; half the students twice
+    now = datetime.now()
+    students = [f"U{i:03d}" for i in range(40)]
+    batch = [(sid, "S002", now, AttendanceState.PRESENT) for sid in students]
+    return batch + batch[worker % 2::2]
+
+
+def _write_in_process(worker: int) -> None:
+    for checkin in _checkins(worker):
+        write_checkins([checkin])
+
+
+def _assert_unique(data_dir, expected_pairs: int) -> None:
+    ids, pairs = _record_ids_and_pairs(data_dir)
+    assert len(ids) == len(set(ids)) == expected_pairs
+    assert len(pairs) == len(set(pairs))
+
+
+def test_concurrent_threads_write_each_pair_once(data_dir):
+    write_file(data_dir, "attendance.txt", ATTENDANCE)
+    results = [None] * 8
+
+    def worker(n):
+        results[n] = [write_checkins([c])[0] for c in _checkins(n)]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    _assert_unique(data_dir, 41)
+    written = [rid for result in results for rid in result if rid is not None]
+    assert sorted(written) == sorted(_record_ids_and_pairs(data_dir)[0][1:])
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_processes_write_each_pair_once(data_dir):
+    write_file(data_dir, "attendance.txt", ATTENDANCE)
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_write_in_process, args=(n,)) for n in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    assert [p.exitcode for p in processes] == [0] * 4
+    _assert_unique(data_dir, 41)
+    assert min(_record_ids_and_pairs(data_dir)[0][1:]) == "A008"
+
+
+def test_overrides_apply_latest_state_and_note(data_dir):
+    write_file(data_dir, "attendance.txt", ATTENDANCE + "A008,U002,S001,,Absent,\nA009,U003,S001,,Absent,sick\n")
+    update_attendance_states([("A008", AttendanceState.LATE, "first")])
+    update_attendance_states([("A008", AttendanceState.PRESENT, "Correction CR0001 approved"),
+                              ("A999", AttendanceState.PRESENT, "no such record")])
+
+    records = {r.record_id: r for r in iter_attendance_records()}
+    assert records["A008"].state == AttendanceState.PRESENT
+    assert records["A008"].note == "Correction CR0001 approved"
+    assert records["A009"].state == AttendanceState.ABSENT
+    assert records["A009"].note == "sick"
+    assert "A999" not in records
+
+    # Filters see the merged state too
+    assert [r.state for r in iter_attendance_records(student_id="U002")] == [AttendanceState.PRESENT]
+    history, stats = get_student_history("U002")
+    assert stats["present"] == 1 and stats["absent"] == 0
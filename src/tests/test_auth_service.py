@@ -0,0 +1,21 @@
+from conftest import read_file, write_file
+from services.auth_service import authenticate, hash_stored_passwords
+from services.passwords import is_hashed
+
+USERS = "U001,Nguyen Van A,a@gmail.com,123456,student\nU002,Tran Thi B,b@gmail.com,abcdef,lecturer\n"
+
+
+def test_hash_stored_passwords_keeps_logins(data_dir):
+    write_file(data_dir, "users.txt", USERS)
+    assert authenticate("a@gmail.com", "123456").id == "U001"
+
+    assert hash_stored_passwords() == 2
+    lines = [line.split(",") for line in read_file(data_dir, "users.txt").splitlines()]
+    assert [(p[0], p[1], p[2], p[4]) for p in lines] == [
+        ("U001", "Nguyen Van A", "a@gmail.com", "student"),
+        ("U002", "Tran Thi B", "b@gmail.com", "lecturer"),
+    ]
+    assert all(is_hashed(p[3]) for p in lines)
+    assert authenticate("a@gmail.com", "123456").id == "U001"
+    assert authenticate("b@gmail.com", "123456") is None
+    assert hash_stored_passwords() == 0
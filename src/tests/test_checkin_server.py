@@ -0,0 +1,36 @@
+import asyncio
+from datetime import datetime
+
+from conftest import write_file
+from services import checkin_server
+from services.checkin_server import CheckinServer
+
+
+def test_batches_are_capped_and_written_without_delay(data_dir, monkeypatch):
+    start = datetime.now()
+    write_file(data_dir, "sessions.txt", f"S001,CL001,{start:%Y-%m-%d},{start:%H:%M},Week1,RoomA,Open\n")
+    written = []
+    real_write = checkin_server.write_checkins
+
+    def write_checkins(batch):
+        written.append(len(batch))
+        return real_write(batch)
+
+    monkeypatch.setattr(checkin_server, "write_checkins", write_checkins)
+
+    async def run():
+        server = CheckinServer(batch_size=2)
+        server._wakeup = asyncio.Event()
+        server._refresh_sessions()
+        flusher = asyncio.create_task(server._flusher())
+        try:
+            return await asyncio.wait_for(asyncio.gather(
+                *(server.checkin(f"U{i:03d}", "S001") for i in range(5)),
+                server.checkin("U000", "S001"),
+            ), timeout=5)
+        finally:
+            flusher.cancel()
+
+    results = asyncio.run(run())
+    assert [r["ok"] for r in results] == [True] * 5 + [False]
+    assert max(written) <= 2 and sum(written) == 5
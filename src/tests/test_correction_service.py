@@ -0,0 +1,47 @@
+from conftest import read_file, write_file
+from models.attendance import AttendanceState
+from models.correction import CorrectionStatus
+from services import correction_service
+from services.attendance_service import iter_attendance_records
+from services.correction_service import CorrectionService
+
+LINE = "CR0005|U001|S001|A001|Late|Pending||2024-11-10 09:00:00|U002\n"
+
+
+def _request_ids(data_dir):
+    return [line.split("|")[0] for line in read_file(data_dir, "corrections.txt").splitlines()]
+
+
+def test_counter_is_seeded_from_the_file(data_dir):
+    write_file(data_dir, "corrections.txt", LINE)
+    assert CorrectionService().request_correction("U001", "S002", "A002", "Sick", "U002")
+    assert _request_ids(data_dir) == ["CR0005", "CR0006"]
+
+
+def test_existing_counter_does_not_scan_the_file(data_dir, monkeypatch):
+    write_file(data_dir, "corrections.txt", LINE)
+    CorrectionService().request_correction("U001", "S002", "A002", "Sick", "U002")
+
+    def scan(self):
+        raise AssertionError("corrections.txt scanned for the highest id")
+
+    monkeypatch.setattr(CorrectionService, "_get_last_request_number", scan)
+    assert CorrectionService().request_correction("U001", "S003", "A003", "Sick", "U002")
+    assert _request_ids(data_dir)[-1] == "CR0007"
+
+
+def test_failed_override_write_leaves_request_pending(data_dir, monkeypatch):
+    write_file(data_dir, "corrections.txt", LINE)
+    write_file(data_dir, "attendance.txt", "A001,U001,S001,,Absent,\n")
+
+    def fail(updates):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(correction_service, "update_attendance_states", fail)
+    assert not CorrectionService().approve_request("CR0005")
+    assert CorrectionService().get_request("CR0005").status == CorrectionStatus.PENDING
+
+    monkeypatch.undo()
+    assert CorrectionService().approve_request("CR0005")
+    assert CorrectionService().get_request("CR0005").status == CorrectionStatus.APPROVED
+    assert [r.state for r in iter_attendance_records()] == [AttendanceState.PRESENT]
@@ -0,0 +1,114 @@
+import pytest
+
+from conftest import write_file
+from services import repository
+from services.repository import (
+    append_lines, compact_records, load_incremental, next_sequence, tombstone_line, write_lines
+)
+from services.storage import SQLiteStorage
+
+
+@pytest.fixture(params=["text", "sqlite"])
+def backend(request, data_dir):
+    """Run a test on the plain-text files and on SQLite."""
+    if request.param == "sqlite":
+        repository.set_storage(SQLiteStorage(str(data_dir / "sas.db")))
+    return request.param
+
+
+def _feed_list(log: list, lines) -> None:
+    log.extend(lines)
+
+
+def test_incremental_load_feeds_only_appended_lines(backend):
+    write_lines("log.txt", ["a", "b"])
+    fed = []
+
+    def feed(log, lines):
+        lines = list(lines)
+        fed.append(lines)
+        log.extend(lines)
+
+    first = load_incremental("log.txt", list, feed)
+    assert first == ["a", "b"]
+    assert load_incremental("log.txt", list, feed) is first
+    assert fed == [["a", "b"]]
+
+    append_lines("log.txt", ["c"])
+    assert load_incremental("log.txt", list, feed) is first
+    assert first == ["a", "b", "c"]
+    assert fed == [["a", "b"], ["c"]]
+
+
+def test_incremental_load_rebuilds_after_rewrite(backend):
+    write_lines("log.txt", ["a", "b"])
+    first = load_incremental("log.txt", list, _feed_list)
+    write_lines("log.txt", ["x"])
+    second = load_incremental("log.txt", list, _feed_list)
+    assert second is not first
+    assert second == ["x"]
+
+
+def test_incremental_load_sees_rewrite_by_another_writer(data_dir):
+    # Rewritten in place and longer than before: only the bytes before the
+    # read offset show that this is not an append
+    write_file(data_dir, "log.txt", "a\nb\n")
+    first = load_incremental("log.txt", list, _feed_list)
+    write_file(data_dir, "log.txt", "c\nd\ne\n")
+    assert load_incremental("log.txt", list, _feed_list) == ["c", "d", "e"]
+    assert first == ["a", "b"]
+
+
+def test_partial_last_line_is_read_once_complete(data_dir):
+    write_file(data_dir, "log.txt", "a\n")
+    log = load_incremental("log.txt", list, _feed_list)
+    with open(data_dir / "log.txt", "a", encoding="utf-8") as fh:
+        fh.write("b")
+        fh.flush()
+        assert load_incremental("log.txt", list, _feed_list) == ["a"]
+        fh.write("c\n")
+    assert load_incremental("log.txt", list, _feed_list) is log
+    assert log == ["a", "bc"]
+
+
+def test_compact_records_keeps_last_live_line_in_first_position(backend):
+    write_lines("courses.txt", [
+        "C001,Python,3",
+        "C002,Database,3",
+        "C003,Networks,2",
+        "C001,Python Programming,3",
+        tombstone_line("C002"),
+        "C004,Short",
+        "C003,Networks,4",
+    ])
+    assert compact_records("courses.txt", 3) == 5
+    assert list(repository.iter_lines("courses.txt")) == ["C001,Python Programming,3", "C003,Networks,4"]
+    assert compact_records("courses.txt", 3) == 0
+
+
+def test_tombstone_then_readd_keeps_record(backend):
+    write_lines("courses.txt", ["C001,Python,3", tombstone_line("C001"), "C001,Python,4"])
+    compact_records("courses.txt", 3)
+    assert list(repository.iter_lines("courses.txt")) == ["C001,Python,4"]
+
+
+def test_next_sequence_floors(backend):
+    assert next_sequence("things") == 1
+    # An int floor always applies
+    assert next_sequence("things", floor=10) == 11
+    assert next_sequence("things", floor=5) == 12
+    # count reserves a block
+    assert next_sequence("things", count=3) == 13
+    assert next_sequence("things") == 16
+
+
+def test_callable_floor_only_seeds_a_missing_counter(backend):
+    calls = []
+
+    def floor():
+        calls.append(1)
+        return 41
+
+    assert next_sequence("seeded", floor=floor) == 42
+    assert next_sequence("seeded", floor=floor) == 43
+    assert calls == [1]
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from conftest import write_file
+from models.academic import SessionStatus
+from services.repository import append_lines
+from services.session_scheduler import SessionScheduler
+from services.timetable_service import get_session_by_id
+
+
+def test_opens_and_locks_on_time(data_dir):
+    write_file(data_dir, "sessions.txt", "S1,CL001,2024-11-10,08:00,Week1,RoomA,Locked\n")
+    scheduler = SessionScheduler()
+    assert scheduler.run_pending(datetime(2024, 11, 10, 7, 40)) == []
+    assert scheduler.run_pending(datetime(2024, 11, 10, 7, 50)) == [("S1", SessionStatus.OPEN)]
+    assert get_session_by_id("S1")["status"] == SessionStatus.OPEN.value
+    assert scheduler.run_pending(datetime(2024, 11, 10, 9, 5)) == [("S1", SessionStatus.LOCKED)]
+
+
+def test_picks_up_session_added_after_load(data_dir):
+    write_file(data_dir, "sessions.txt", "S1,CL001,2024-11-10,08:00,Week1,RoomA,Locked\n")
+    scheduler = SessionScheduler()
+    scheduler.run_pending(datetime(2024, 11, 10, 7, 50))
+
+    append_lines("sessions.txt", ["S4,CL001,2024-11-10,11:00,Week1,RoomA,Locked"])
+    assert ("S4", SessionStatus.OPEN) in scheduler.run_pending(datetime(2024, 11, 10, 10, 50))
+    assert ("S4", SessionStatus.LOCKED) in scheduler.run_pending(datetime(2024, 11, 10, 12, 5))
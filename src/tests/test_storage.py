@@ -0,0 +1,40 @@
+from conftest import read_file, write_file
+from services import admin_service
+from services.storage import SQLiteStorage, TextStorage
+
+
+def test_append_ends_a_line_missing_its_newline(tmp_path):
+    write_file(tmp_path, "courses.txt", "C001,Python Programming,3\nC002,Database Systems,3")
+    TextStorage(str(tmp_path)).append_lines("courses.txt", ["C003,Foo,3"])
+    assert read_file(tmp_path, "courses.txt") == (
+        "C001,Python Programming,3\nC002,Database Systems,3\nC003,Foo,3\n")
+
+
+def test_append_to_new_and_empty_files(tmp_path):
+    storage = TextStorage(str(tmp_path))
+    storage.append_lines("a.txt", ["x"])
+    write_file(tmp_path, "b.txt", "")
+    storage.append_lines("b.txt", ["y", "z"])
+    assert read_file(tmp_path, "a.txt") == "x\n"
+    assert read_file(tmp_path, "b.txt") == "y\nz\n"
+
+
+def test_add_course_after_hand_edit(data_dir):
+    write_file(data_dir, "courses.txt", "C001,Python Programming,3\nC002,Database Systems,3")
+    assert admin_service.list_courses()
+    assert admin_service.add_course("Foo", "3")
+    courses = {c["id"]: c for c in admin_service.list_courses()}
+    assert courses["C002"]["credits"] == "3"
+    assert courses["C003"]["name"] == "Foo"
+
+
+def test_select_lines_in_file_order_on_both_backends(tmp_path):
+    lines = [f"A{i:04d},U{i % 7:03d},S{(i * 37) % 1200:04d},,Present," for i in range(3000)]
+    wanted = {f"S{n:04d}" for n in range(0, 1200, 2)}
+    text, sqlite = TextStorage(str(tmp_path)), SQLiteStorage(str(tmp_path / "sas.db"))
+    text.write_lines("attendance.txt", lines)
+    sqlite.write_lines("attendance.txt", lines)
+
+    expected = [line for line in lines if line.split(",")[2] in wanted]
+    assert list(text.select_lines("attendance.txt", "session_id", wanted)) == expected
+    assert list(sqlite.select_lines("attendance.txt", "session_id", wanted)) == expected